@@ -0,0 +1,173 @@
+# backends.py
+# CPU 추론 백엔드: eager / torchscript / onnx(ONNX Runtime) / quantized(int8)
+# 내보낸 아티팩트는 (모델 저장소에 캐시된) model.pkl 옆에 저장하고, model.pkl이 더 새로우면 다시 내보냄
+import copy, inspect, os, time
+import numpy as np
+import torch
+from torch import nn
+from inference import TensorPreprocessor, batch_predict
+from metrics import percentile
+
+BACKENDS = ("eager", "torchscript", "onnx", "quantized")
+QUANT_MODES = ("dynamic", "static")
+
+# ======================
+# 스레드 설정
+# ======================
+def configure_threads(intra: int | None = None, inter: int | None = None):
+    """torch 연산 스레드 수 설정. 0/None이면 기본값 유지."""
+    if intra: torch.set_num_threads(int(intra))
+    if inter:
+        try:
+            torch.set_interop_threads(int(inter))
+        except RuntimeError:
+            pass  # 병렬 작업이 한 번이라도 시작된 뒤에는 변경 불가 (재시작 필요)
+
+# ======================
+# 내보내기
+# ======================
+def artifact_path(model_path: str, backend: str, quant_mode: str = "dynamic") -> str:
+    base = os.path.splitext(model_path)[0]
+    return {"torchscript": f"{base}.ts.pt", "onnx": f"{base}.onnx",
+            "quantized": f"{base}.int8-{quant_mode}.ts.pt"}[backend]
+
+def _is_fresh(path: str, model_path: str) -> bool:
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(model_path)
+
+def example_input(learner, batch_size: int = 1) -> torch.Tensor:
+    prep = TensorPreprocessor.from_learner(learner)
+    if prep is None:
+        raise ValueError("입력 크기를 알 수 없습니다 (Resize 변환이 없음)")
+    w, h = prep.size
+    return torch.randn(batch_size, 3, h, w)
+
+def quantize_model(model: nn.Module, mode: str, example: torch.Tensor, calib: list | None = None) -> nn.Module:
+    """dynamic: Linear 가중치만 int8. static: FX 그래프 모드로 conv까지 int8 (calib 배치 필요)."""
+    from torch.ao import quantization as tq
+    model = model.eval()
+    if mode == "dynamic":
+        return tq.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    if mode != "static":
+        raise ValueError(f"알 수 없는 양자화 방식: {mode} (가능: {', '.join(QUANT_MODES)})")
+    if not calib:
+        raise ValueError("static 양자화에는 보정용 이미지 배치(calib)가 필요합니다")
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+    prepared = prepare_fx(copy.deepcopy(model), tq.get_default_qconfig_mapping("fbgemm"), (example,))
+    with torch.inference_mode():
+        for xb in calib: prepared(xb)
+    return convert_fx(prepared)
+
+def _onnx_export(model: nn.Module, example: torch.Tensor, path: str):
+    """배치 차원을 가변으로 ONNX 내보내기. 최신 torch의 기본(dynamo) 내보내기는 onnxscript가 필요하고,
+    가중치를 <파일>.data로 따로 쓰면 임시파일 이름이 남으므로 한 파일에 저장 (2GB 미만 모델)."""
+    kw = {}
+    if "external_data" in inspect.signature(torch.onnx.export).parameters:
+        kw["external_data"] = False
+    torch.onnx.export(model, example, path, input_names=["input"], output_names=["logits"],
+                      dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}}, opset_version=17, **kw)
+
+def export_backend(learner, backend: str, model_path: str, quant_mode: str = "dynamic",
+                   calib: list | None = None, force: bool = False) -> str:
+    """learner.model을 backend 형식으로 한 번만 내보내고 경로 반환.
+    static 양자화는 보정 이미지가 필요하므로 `python backends.py 이미지들 --backends quantized --quant static`을
+    앱과 같은 모델 소스 옵션(--model / --sha256 / --version / --cache-dir)으로 실행해 캐시된 모델 옆에 미리 만들어 두면
+    앱은 그 파일을 사용."""
+    path = artifact_path(model_path, backend, quant_mode)
+    if not force and _is_fresh(path, model_path):
+        return path
+    model = learner.model.eval()
+    example = example_input(learner)
+    tmp = path + ".tmp"
+    with torch.no_grad():
+        if backend == "onnx":
+            _onnx_export(model, example, tmp)
+        else:
+            if backend == "quantized":
+                model = quantize_model(model, quant_mode, example, calib)
+            ts = torch.jit.freeze(torch.jit.trace(model, example))
+            ts.save(tmp)
+    os.replace(tmp, path)
+    return path
+
+# ======================
+# 로드
+# ======================
+def _onnx_forward(path: str, intra: int | None, inter: int | None):
+    import onnxruntime as ort
+    opts = ort.SessionOptions()
+    if intra: opts.intra_op_num_threads = int(intra)
+    if inter: opts.inter_op_num_threads = int(inter)
+    sess = ort.InferenceSession(path, opts, providers=["CPUExecutionProvider"])
+    def forward(xb: torch.Tensor) -> torch.Tensor:
+        return torch.from_numpy(sess.run(None, {"input": np.ascontiguousarray(xb.numpy())})[0])
+    return forward
+
+def load_backend(learner, backend: str, model_path: str, quant_mode: str = "dynamic",
+                 calib: list | None = None, intra: int | None = None, inter: int | None = None):
+    """xb → logits 함수를 반환. batch_predict(forward=...)에 그대로 넘기면 됨."""
+    if backend not in BACKENDS:
+        raise ValueError(f"알 수 없는 백엔드: {backend} (가능: {', '.join(BACKENDS)})")
+    if backend == "eager":
+        return learner.model.eval()
+    path = export_backend(learner, backend, model_path, quant_mode, calib)
+    if backend == "onnx":
+        return _onnx_forward(path, intra, inter)
+    return torch.jit.load(path, map_location="cpu").eval()
+
+# ======================
+# 정확도/지연시간 비교
+# ======================
+def compare_backends(learner, model_path: str, images: list, backends=BACKENDS, quant_mode: str = "dynamic",
+                     repeat: int = 5, intra: int | None = None, inter: int | None = None) -> dict:
+    """같은 이미지를 각 백엔드로 돌려 eager 대비 top-1 일치율, 확률 최대 오차, 이미지당 지연시간 비교."""
+    configure_threads(intra, inter)
+    prep = TensorPreprocessor.from_learner(learner)
+    calib = [prep(images[i:i + 8]) for i in range(0, len(images), 8)] if prep else None
+    ref = batch_predict(learner, images, preprocess=prep)
+    report = {}
+    for b in backends:
+        try:
+            fwd = load_backend(learner, b, model_path, quant_mode, calib, intra, inter)
+        except Exception as e:
+            report[b] = {"error": f"{type(e).__name__}: {e}"}
+            continue
+        out = batch_predict(learner, images, forward=fwd, preprocess=prep)
+        lat = []
+        for _ in range(repeat):
+            for img in images:
+                t0 = time.perf_counter()
+                batch_predict(learner, [img], forward=fwd, preprocess=prep)
+                lat.append(time.perf_counter() - t0)
+        report[b] = {"top1_agree": sum(str(a[0]) == str(r[0]) for a, r in zip(out, ref)) / len(images),
+                     "max_abs_diff": max(float((a[2] - r[2]).abs().max()) for a, r in zip(out, ref)),
+                     "p50_ms": percentile(lat, 50) * 1000, "p99_ms": percentile(lat, 99) * 1000}
+    return report
+
+if __name__ == "__main__":
+    # python backends.py img1.jpg img2.jpg ... [--model model.pkl] [--backends eager,onnx] [--quant static] [--threads 4]
+    # 모델은 앱과 같은 저장소(.model_cache)를 거쳐 불러오므로 내보낸 아티팩트도 앱이 찾는 위치에 생김
+    import argparse, json
+    from inference import decode_image
+    from model_store import bootstrap_model, source_from_uri
+    ap = argparse.ArgumentParser(description="추론 백엔드 정확도/지연시간 비교 (아티팩트 미리 만들기)")
+    ap.add_argument("images", nargs="+")
+    ap.add_argument("--model", action="append", default=None,
+                    help="모델 소스 (로컬 경로 / file:// / http(s):// / gdrive:<id>). 여러 번 지정 가능")
+    ap.add_argument("--sha256", default=None)
+    ap.add_argument("--version", default=None, help="캐시 버전 (생략하면 해시 또는 소스 크기·mtime으로 결정)")
+    ap.add_argument("--cache-dir", default=".model_cache")
+    ap.add_argument("--refresh", default="never", choices=("never", "now"),
+                    help="해시 없는 Drive 등 revision을 모르는 소스의 캐시 사본을 다시 받을지")
+    ap.add_argument("--backends", default=",".join(BACKENDS))
+    ap.add_argument("--quant", default="dynamic", choices=QUANT_MODES)
+    ap.add_argument("--threads", type=int, default=None)
+    ap.add_argument("--interop-threads", type=int, default=None)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    configure_threads(args.threads, args.interop_threads)
+    sources = [source_from_uri(u) for u in (args.model or ["model.pkl"])]
+    learn, path, _ = bootstrap_model(sources, args.version, args.sha256, args.cache_dir, args.refresh)
+    imgs = [decode_image(open(f, "rb").read()) for f in args.images]
+    res = compare_backends(learn, path, imgs, args.backends.split(","), args.quant,
+                           args.repeat, args.threads, args.interop_threads)
+    print(json.dumps({"model_path": path, **res}, ensure_ascii=False, indent=2))
@@ -0,0 +1,276 @@
+# bench.py
+# 예측 경로 벤치마크 (Streamlit UI 없이 앱과 같은 함수 사용): 디코딩 → PILImage.create → learner.predict / 직접 전처리 경로
+# 오프라인용 작은 합성 모델을 만들어 쓰거나 --model로 로컬 model.pkl 지정. 결과는 JSON으로 저장해 커밋 간 비교
+#   python bench.py --out bench.json
+#   python bench.py --model model.pkl --out new.json --compare bench.json
+import argparse, json, os, platform, resource, subprocess, sys, tempfile, time
+from io import BytesIO
+from pathlib import Path
+import numpy as np
+import torch
+from PIL import Image
+from inference import TensorPreprocessor, batch_predict, decode_image
+from metrics import percentile, rss_bytes
+
+SIZES = {"thumb": (160, 120), "vga": (640, 480), "fhd": (1920, 1080), "12mp": (4000, 3000)}
+FORMATS = ("JPEG", "PNG", "WEBP", "TIFF")
+
+# ======================
+# 합성 모델 / 입력
+# ======================
+def make_synthetic_model(path: str, size: int = 64, n_classes: int = 3, arch: str = "tiny",
+                         resize_method: str = "crop") -> str:
+    """클래스별 단색+잡음 이미지로 작은 Learner를 만들어 export (네트워크 불필요)."""
+    from fastai.vision.all import (CategoryBlock, CrossEntropyLossFlat, DataBlock, ImageBlock, Learner, Normalize,
+                                   RandomSplitter, Resize, get_image_files, imagenet_stats, nn, parent_label,
+                                   resnet18, vision_learner)
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as d:
+        for c in range(n_classes):
+            os.makedirs(os.path.join(d, f"class{c}"))
+            for i in range(8):
+                arr = np.clip(rng.normal(60 + 60 * c, 30, (size, size, 3)), 0, 255).astype(np.uint8)
+                Image.fromarray(arr).save(os.path.join(d, f"class{c}", f"{i}.png"))
+        dls = DataBlock(blocks=(ImageBlock, CategoryBlock), get_items=get_image_files, get_y=parent_label,
+                        splitter=RandomSplitter(seed=0), item_tfms=Resize(size, method=resize_method),
+                        batch_tfms=Normalize.from_stats(*imagenet_stats)).dataloaders(d, bs=8, num_workers=0)
+        if arch == "resnet18":
+            learn = vision_learner(dls, resnet18, pretrained=False)
+        else:
+            model = nn.Sequential(nn.Conv2d(3, 16, 3, 2, 1), nn.ReLU(), nn.Conv2d(16, 32, 3, 2, 1), nn.ReLU(),
+                                  nn.AdaptiveAvgPool2d(1), nn.Flatten(), nn.Linear(32, n_classes))
+            learn = Learner(dls, model, loss_func=CrossEntropyLossFlat())
+        learn.fit(1)
+        learn.path = Path(os.path.dirname(os.path.abspath(path)))
+        learn.export(os.path.basename(path))
+    return path
+
+def make_image(size: tuple[int, int], fmt: str, exif_rotate: bool, seed: int = 0) -> bytes:
+    """그라디언트 + 약한 잡음 (실제 사진과 비슷한 압축률). exif_rotate면 Orientation=6 (90° 회전) 태그."""
+    w, h = size
+    rng = np.random.default_rng(seed)
+    x, y = np.meshgrid(np.linspace(0, 255, w, dtype=np.float32), np.linspace(0, 255, h, dtype=np.float32))
+    arr = np.stack([x, y, (x + y) / 2], -1) + rng.normal(0, 8, (h, w, 3)).astype(np.float32)
+    img = Image.fromarray(np.clip(arr, 0, 255).astype(np.uint8))
+    kw = {"quality": 90} if fmt in ("JPEG", "WEBP") else {}
+    if exif_rotate:
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        kw["exif"] = exif.tobytes()
+    buf = BytesIO()
+    img.save(buf, fmt, **kw)
+    return buf.getvalue()
+
+def make_corpus(sizes=SIZES, formats=FORMATS) -> list[dict]:
+    return [{"name": f"{s}-{fmt.lower()}{'-exif' if rot else ''}", "size": s, "format": fmt, "exif": rot,
+             "bytes": make_image(SIZES[s], fmt, rot)}
+            for s in sizes for fmt in formats for rot in (False, True)]
+
+# ======================
+# 측정
+# ======================
+def _summary(values: list) -> dict:
+    return {"n": len(values), "p50_ms": percentile(values, 50) * 1000, "p90_ms": percentile(values, 90) * 1000,
+            "p99_ms": percentile(values, 99) * 1000}
+
+def bench_stages(learner, corpus: list[dict], repeat: int = 5) -> dict:
+    """이미지마다 앱과 같은 단계별 지연시간. legacy = PILImage.create + learner.predict, direct = 직접 전처리 경로."""
+    from fastai.vision.all import PILImage
+    prep = TensorPreprocessor.from_learner(learner)
+    out = {}
+    for item in corpus:
+        acc: dict[str, list] = {"decode": [], "exif_transpose": [], "pilimage_create": [], "learner_predict": []}
+        if prep is not None: acc["direct_predict"], acc["direct_predict_draft"] = [], []
+        for _ in range(repeat):
+            t = {}
+            pil = decode_image(item["bytes"], timings=t)
+            acc["decode"].append(t["decode"])
+            acc["exif_transpose"].append(t["exif_transpose"])
+            t0 = time.perf_counter()
+            fa = PILImage.create(np.array(pil))
+            acc["pilimage_create"].append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            learner.predict(fa)
+            acc["learner_predict"].append(time.perf_counter() - t0)
+            if prep is not None:
+                t0 = time.perf_counter()
+                batch_predict(learner, [pil], preprocess=prep)
+                acc["direct_predict"].append(time.perf_counter() - t0)
+                t0 = time.perf_counter()  # 디코딩부터 draft로 줄여서 끝까지
+                batch_predict(learner, [decode_image(item["bytes"], prep.draft_size)], preprocess=prep)
+                acc["direct_predict_draft"].append(time.perf_counter() - t0)
+        out[item["name"]] = {k: _summary(v) for k, v in acc.items()}
+    return out
+
+def bench_throughput(learner, corpus: list[dict], batch_sizes=(1, 4, 8, 16), threads=(1, 2, 4),
+                     seconds: float = 2.0) -> list[dict]:
+    """배치 크기 × 스레드 수별 images/sec (디코딩 제외, 전처리 + forward). thumb/vga가 있으면 그것만 사용."""
+    prep = TensorPreprocessor.from_learner(learner)
+    small = [c for c in corpus if c["size"] in ("thumb", "vga")]
+    imgs = [decode_image(c["bytes"]) for c in (small or corpus)]  # 작은 크기를 안 골랐으면 고른 크기 그대로
+    if not imgs: return []
+    default_threads, rows = torch.get_num_threads(), []
+    for t in threads:
+        torch.set_num_threads(t)
+        for bs in batch_sizes:
+            batch = [imgs[i % len(imgs)] for i in range(bs)]
+            batch_predict(learner, batch, preprocess=prep)  # 워밍업
+            n, t0 = 0, time.perf_counter()
+            while time.perf_counter() - t0 < seconds:
+                batch_predict(learner, batch, preprocess=prep)
+                n += bs
+            rows.append({"threads": t, "batch_size": bs, "images_per_sec": n / (time.perf_counter() - t0)})
+    torch.set_num_threads(default_threads)
+    return rows
+
+def bench_cold_start(model_path: str) -> dict:
+    """새 프로세스에서 import → 모델 저장소 복사·검증 → 언피클 → 첫 추론까지."""
+    code = f"""
+import json, sys, tempfile, time
+t0 = time.perf_counter()
+from inference import TensorPreprocessor
+from model_store import LocalSource, bootstrap_model, warm_up
+t_import = time.perf_counter() - t0
+with tempfile.TemporaryDirectory() as d:
+    learn, _, timings = bootstrap_model([LocalSource({model_path!r})], "bench", cache_dir=d)
+    warm_up(learn, timings, preprocess=TensorPreprocessor.from_learner(learn))
+timings.update(import_s=t_import, process_total_s=time.perf_counter() - t0)
+json.dump(timings, sys.stdout)
+"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    r = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=here, check=True)
+    return json.loads(r.stdout.strip().splitlines()[-1])
+
+def peak_rss_bytes() -> int:
+    r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return r if sys.platform == "darwin" else r * 1024  # macOS는 바이트, 리눅스는 KB
+
+MEMORY_PATHS = ("legacy", "direct", "direct_draft")
+
+def bench_memory(model_path: str, corpus: list[dict], fmt: str = "JPEG") -> dict:
+    """예측 경로 하나만 도는 새 프로세스에서 최대 RSS 증가량 측정 (모델 로드 후 → 디코딩 + 추론 끝까지, 샘플링).
+    합성 모델 학습·코퍼스 생성 같은 벤치마크 자체의 메모리는 섞이지 않음."""
+    code = f"""
+import json, sys, threading, time
+import numpy as np
+from fastai.vision.all import PILImage, load_learner
+from inference import TensorPreprocessor, batch_predict, decode_image
+from metrics import rss_bytes
+learn = load_learner({model_path!r}, cpu=True)
+learn.model.eval()
+prep = TensorPreprocessor.from_learner(learn)
+batch_predict(learn, [decode_image(open(sys.argv[2], "rb").read())], preprocess=prep)  # 워밍업 (작은 이미지)
+data = open(sys.argv[1], "rb").read()
+base, peak, done = rss_bytes(), [0], threading.Event()
+def sample():  # ru_maxrss는 모델 로드 때의 최고치에 가려질 수 있으므로 RSS를 직접 샘플링
+    while not done.is_set():
+        peak[0] = max(peak[0], rss_bytes())
+        time.sleep(0.0005)
+t = threading.Thread(target=sample, daemon=True)
+t.start()
+if sys.argv[3] == "legacy":
+    learn.predict(PILImage.create(np.array(decode_image(data))))
+elif sys.argv[3] == "direct":
+    batch_predict(learn, [decode_image(data)], preprocess=prep)
+else:
+    batch_predict(learn, [decode_image(data, prep.draft_size)], preprocess=prep)
+done.set()
+t.join()
+peak[0] = max(peak[0], rss_bytes())
+json.dump({{"peak_delta_bytes": peak[0] - base, "rss_after_delta_bytes": rss_bytes() - base}}, sys.stdout)
+"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    out = {}
+    with tempfile.TemporaryDirectory() as d:
+        small = os.path.join(d, "warmup.jpg")
+        with open(small, "wb") as f: f.write(make_image(SIZES["thumb"], "JPEG", False))
+        for item in corpus:
+            if item["format"] != fmt or item["exif"]: continue
+            src = os.path.join(d, item["name"])
+            with open(src, "wb") as f: f.write(item["bytes"])
+            out[item["name"]] = {}
+            for path in MEMORY_PATHS:
+                r = subprocess.run([sys.executable, "-c", code, src, small, path], capture_output=True, text=True,
+                                   cwd=here, check=True)
+                out[item["name"]][path] = json.loads(r.stdout.strip().splitlines()[-1])
+    return out
+
+def meta(args) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"commit": commit, "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+            "torch": torch.__version__, "platform": platform.platform(), "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k != "compare"}}
+
+def compare(new: dict, old: dict) -> list[str]:
+    """단계별 p50, 예측 경로별 최대 메모리, 처리량을 이전 결과와 비교 (비율 = 새 / 이전)."""
+    lines = []
+    for name, stages in new["stages"].items():
+        for stage, s in stages.items():
+            o = old.get("stages", {}).get(name, {}).get(stage)
+            if o and o["p50_ms"] > 0:
+                lines.append(f"{name:24s} {stage:22s} p50 {o['p50_ms']:9.2f} → {s['p50_ms']:9.2f} ms "
+                             f"(x{s['p50_ms'] / o['p50_ms']:.2f})")
+    old_mem = old.get("memory", {}).get("prediction_paths", {})
+    for name, paths in new.get("memory", {}).get("prediction_paths", {}).items():
+        for path, m in paths.items():
+            o = old_mem.get(name, {}).get(path)
+            if o and o["peak_delta_bytes"] > 0:
+                lines.append(f"{name:24s} {path:22s} peak {o['peak_delta_bytes'] / 2**20:8.1f} → "
+                             f"{m['peak_delta_bytes'] / 2**20:8.1f} MB (x{m['peak_delta_bytes'] / o['peak_delta_bytes']:.2f})")
+    old_tp = {(r["threads"], r["batch_size"]): r["images_per_sec"] for r in old.get("throughput", [])}
+    for r in new["throughput"]:
+        o = old_tp.get((r["threads"], r["batch_size"]))
+        if o:
+            lines.append(f"threads={r['threads']} bs={r['batch_size']:<3d} {o:9.1f} → {r['images_per_sec']:9.1f} img/s "
+                         f"(x{r['images_per_sec'] / o:.2f})")
+    return lines
+
+def main():
+    ap = argparse.ArgumentParser(description="예측 경로 벤치마크")
+    ap.add_argument("--model", default=None, help="로컬 model.pkl (없으면 합성 모델 생성)")
+    ap.add_argument("--arch", default="tiny", choices=("tiny", "resnet18"), help="합성 모델 구조")
+    ap.add_argument("--input-size", type=int, default=224, help="합성 모델 입력 크기")
+    ap.add_argument("--sizes", default=",".join(SIZES))
+    ap.add_argument("--formats", default=",".join(FORMATS))
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--batch-sizes", default="1,4,8,16")
+    ap.add_argument("--threads", default="1,2,4")
+    ap.add_argument("--seconds", type=float, default=2.0, help="처리량 측정 구간당 시간")
+    ap.add_argument("--out", default="bench.json")
+    ap.add_argument("--compare", default=None, help="비교할 이전 결과 JSON")
+    args = ap.parse_args()
+
+    from fastai.vision.all import load_learner
+    tmp = None
+    model_path = args.model
+    if model_path is None:
+        tmp = tempfile.TemporaryDirectory()
+        model_path = make_synthetic_model(os.path.join(tmp.name, "model.pkl"), args.input_size, arch=args.arch)
+    result = {"meta": meta(args), "cold_start": bench_cold_start(model_path)}
+    learner = load_learner(model_path, cpu=True)
+    learner.model.eval()
+    corpus = make_corpus(args.sizes.split(","), args.formats.split(","))
+    rss0 = rss_bytes()
+    result["stages"] = bench_stages(learner, corpus, args.repeat)
+    result["throughput"] = bench_throughput(learner, corpus, [int(x) for x in args.batch_sizes.split(",")],
+                                            [int(x) for x in args.threads.split(",")], args.seconds)
+    # harness_*는 합성 모델 학습·코퍼스 생성까지 포함한 이 프로세스의 값. 예측 경로의 메모리는 prediction_paths
+    result["memory"] = {"prediction_paths": bench_memory(model_path, corpus),
+                        "harness_rss_before_bytes": rss0, "harness_rss_after_bytes": rss_bytes(),
+                        "harness_peak_rss_bytes": peak_rss_bytes(),
+                        "corpus_bytes": sum(len(c["bytes"]) for c in corpus)}
+    if tmp is not None: tmp.cleanup()
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"결과 저장: {args.out}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print("\n".join(compare(result, json.load(f))))
+
+if __name__ == "__main__":
+    main()
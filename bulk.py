@@ -0,0 +1,203 @@
+# bulk.py
+# 일괄 분류: 여러 파일 / ZIP / 폴더 → 디코딩 스레드풀 → 배치 추론 → 결과를 한 행씩 스트리밍
+# 디코딩 스레드에서 바로 모델 입력 크기로 줄이므로, 대기열에는 모델 크기 이미지만 최대 2 * batch_size 장
+# (현재 배치 + 미리 디코딩 중인 배치). 원본 해상도 디코딩은 ingest의 헤더 검사(Limits)와 메모리 예산(MemoryBudget)을 거침
+import csv, os, time, zipfile
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from inference import batch_predict
+from ingest import IngestError, Limits, MemoryBudget, decode_bounded
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".webp", ".tif", ".tiff", ".bmp")
+
+def is_image_name(name: str) -> bool:
+    return name.lower().endswith(IMAGE_EXTS) and not os.path.basename(name).startswith(".")
+
+# ======================
+# 입력 소스: (이름, 바이트를 읽는 함수) 를 차례로 내보냄
+# max_bytes를 주면 그보다 큰 항목은 읽기 전에(또는 읽는 도중 상한에서) IngestError → 해당 행의 error
+# ======================
+def _too_large(size: int, max_bytes: int):
+    raise IngestError(f"파일이 너무 큽니다 ({size / 2**20:.1f}MB > {max_bytes / 2**20:.0f}MB).")
+
+def read_capped(f, max_bytes: int | None, name: str = "") -> bytes:
+    """스트림에서 최대 max_bytes까지만 읽음 (헤더의 크기 정보를 믿지 않음)."""
+    if max_bytes is None: return f.read()
+    data = f.read(max_bytes + 1)
+    if len(data) > max_bytes: _too_large(len(data), max_bytes)
+    return data
+
+def iter_zip(fileobj, prefix: str = "", max_bytes: int | None = None):
+    zf = zipfile.ZipFile(fileobj)
+    for info in zf.infolist():
+        if info.is_dir() or not is_image_name(info.filename): continue
+        if max_bytes is not None and info.file_size > max_bytes:
+            yield f"{prefix}{info.filename}", (lambda s=info.file_size: _too_large(s, max_bytes))
+            continue
+        def read(i=info):
+            with zf.open(i) as f: return read_capped(f, max_bytes)
+        yield f"{prefix}{info.filename}", read
+
+def _read_file(path: str, max_bytes: int | None) -> bytes:
+    if max_bytes is not None and os.path.getsize(path) > max_bytes:
+        _too_large(os.path.getsize(path), max_bytes)
+    with open(path, "rb") as f: return read_capped(f, max_bytes)
+
+def iter_folder(root: str, max_bytes: int | None = None):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for fn in sorted(filenames):
+            path = os.path.join(dirpath, fn)
+            if is_image_name(fn):
+                yield os.path.relpath(path, root), (lambda p=path: _read_file(p, max_bytes))
+            elif fn.lower().endswith(".zip"):
+                yield from iter_zip(path, os.path.relpath(path, root) + "/", max_bytes)
+
+def iter_uploads(files, max_bytes: int | None = None):
+    """st.file_uploader(accept_multiple_files=True) 결과. ZIP은 풀어서 내보냄."""
+    for f in files:
+        if f.name.lower().endswith(".zip"):
+            yield from iter_zip(f, f.name + "/", max_bytes)
+        elif max_bytes is not None and f.size > max_bytes:
+            yield f.name, (lambda s=f.size: _too_large(s, max_bytes))
+        else:
+            yield f.name, f.getvalue
+
+def iter_paths(paths: list[str], max_bytes: int | None = None):
+    """CLI 인자: 폴더 / ZIP / 이미지 파일 경로."""
+    for p in paths:
+        if os.path.isdir(p): yield from iter_folder(p, max_bytes)
+        elif p.lower().endswith(".zip"): yield from iter_zip(p, os.path.basename(p) + "/", max_bytes)
+        else: yield p, (lambda p=p: _read_file(p, max_bytes))
+
+# ======================
+# 분류 파이프라인
+# ======================
+def _decode(entry, draft_size, preprocess, limits, budget):
+    """헤더 검사 → 메모리 예산 안에서 디코딩 → 모델 입력 크기로 축소. 거부·실패는 행의 error로."""
+    name, read = entry
+    try:
+        _, img, flagged = decode_bounded(read(), budget, limits, draft_size,
+                                         preprocess.resize if preprocess is not None else None)
+        return name, img, flagged, None
+    except Exception as e:
+        return name, None, False, f"{type(e).__name__}: {e}"
+
+def _rows(learner, decoded, forward, preprocess, top_k: int) -> list[dict]:
+    ok = [i for i, (_, _, _, err) in enumerate(decoded) if err is None]
+    preds = batch_predict(learner, [decoded[i][1] for i in ok], forward, preprocess) if ok else []
+    by_idx = dict(zip(ok, preds))
+    vocab = learner.dls.vocab
+    rows = []
+    for i, (name, _, flagged, err) in enumerate(decoded):
+        row = {"file": name, "flagged": flagged, "error": err or ""}
+        if i in by_idx:
+            probs = by_idx[i][2]
+            vals, idxs = probs.topk(min(top_k, len(probs)))
+            for r, (v, j) in enumerate(zip(vals, idxs), 1):
+                row[f"top{r}"], row[f"p{r}"] = str(vocab[int(j)]), round(float(v), 6)
+        rows.append(row)
+    return rows
+
+def classify_stream(learner, entries, forward=None, preprocess=None, batch_size: int = 32,
+                    workers: int = 4, top_k: int = 3, fast_decode: bool = False, limits: Limits = Limits(),
+                    budget: MemoryBudget | None = None):
+    """entries를 batch_size씩 디코딩(스레드풀, 모델 입력 크기로 축소까지) → 배치 추론.
+    다음 배치 디코딩은 현재 배치 추론과 겹쳐서 진행."""
+    draft = preprocess.draft_size if (fast_decode and preprocess is not None) else None
+    budget = budget or MemoryBudget()  # 단일 이미지 경로와 같은 예산을 넘기면 함께 제한됨
+    entries = iter(entries)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk-decode") as pool:
+        def submit_next():
+            chunk = list(islice(entries, batch_size))
+            return [pool.submit(_decode, e, draft, preprocess, limits, budget) for e in chunk]
+        pending = submit_next()
+        while pending:
+            decoded = [f.result() for f in pending]
+            pending = submit_next()
+            yield from _rows(learner, decoded, forward, preprocess, top_k)
+
+class Throughput:
+    """처리 개수 / 경과 시간 → images/sec."""
+    def __init__(self): self.t0, self.n = time.perf_counter(), 0
+    def add(self, n: int = 1): self.n += n
+    @property
+    def elapsed(self) -> float: return time.perf_counter() - self.t0
+    @property
+    def rate(self) -> float: return self.n / self.elapsed if self.elapsed > 0 else 0.0
+
+# ======================
+# 결과 저장
+# ======================
+def result_columns(top_k: int) -> list[str]:
+    return ["file"] + [c for r in range(1, top_k + 1) for c in (f"top{r}", f"p{r}")] + ["flagged", "error"]
+
+def write_csv(rows, path_or_buf, top_k: int = 3):
+    """rows는 제너레이터여도 됨 (한 행씩 기록)."""
+    own = isinstance(path_or_buf, str)
+    f = open(path_or_buf, "w", newline="", encoding="utf-8") if own else path_or_buf
+    try:
+        w = csv.DictWriter(f, fieldnames=result_columns(top_k), extrasaction="ignore")
+        w.writeheader()
+        for row in rows: w.writerow(row)
+    finally:
+        if own: f.close()
+
+def to_parquet_bytes(rows: list[dict], top_k: int = 3) -> bytes:
+    import pandas as pd
+    from io import BytesIO
+    buf = BytesIO()
+    pd.DataFrame(rows, columns=result_columns(top_k)).to_parquet(buf, index=False)
+    return buf.getvalue()
+
+if __name__ == "__main__":
+    # python bulk.py 사진폴더/ 묶음.zip --out results.csv [--model model.pkl] [--backend onnx]
+    import argparse, sys
+    from backends import BACKENDS, configure_threads, load_backend
+    from inference import TensorPreprocessor
+    from model_store import bootstrap_model, source_from_uri
+    ap = argparse.ArgumentParser(description="폴더 / ZIP 일괄 분류")
+    ap.add_argument("inputs", nargs="+", help="폴더, ZIP 또는 이미지 파일")
+    ap.add_argument("--out", default="results.csv", help=".csv 또는 .parquet")
+    ap.add_argument("--model", action="append", default=None,
+                    help="모델 소스 (로컬 경로 / file:// / http(s):// / gdrive:<id>). 여러 번 지정 가능")
+    ap.add_argument("--sha256", default=None)
+    ap.add_argument("--version", default=None, help="캐시 버전 (생략하면 해시 또는 소스 크기·mtime으로 결정)")
+    ap.add_argument("--cache-dir", default=".model_cache")
+    ap.add_argument("--refresh", default="never", choices=("never", "now"),
+                    help="해시 없는 Drive 등 revision을 모르는 소스의 캐시 사본을 다시 받을지")
+    ap.add_argument("--backend", default="eager", choices=BACKENDS)
+    ap.add_argument("--quant", default="dynamic")
+    ap.add_argument("--batch-size", type=int, default=32)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--top-k", type=int, default=3)
+    ap.add_argument("--threads", type=int, default=None)
+    ap.add_argument("--fast-decode", action="store_true")
+    ap.add_argument("--max-image-mb", type=float, default=20, help="파일 하나의 크기 상한")
+    ap.add_argument("--max-image-mp", type=float, default=50, help="해상도 상한 (메가픽셀)")
+    ap.add_argument("--memory-budget-mb", type=int, default=512, help="동시에 디코딩 중인 이미지의 예상 메모리 상한")
+    args = ap.parse_args()
+
+    configure_threads(args.threads)
+    sources = [source_from_uri(u) for u in (args.model or ["model.pkl"])]
+    learn, path, _ = bootstrap_model(sources, args.version, args.sha256, args.cache_dir, args.refresh)
+    fwd = load_backend(learn, args.backend, path, args.quant, intra=args.threads)
+    prep = TensorPreprocessor.from_learner(learn)
+    tp = Throughput()
+
+    def progress(rows):
+        for row in rows:
+            tp.add()
+            if tp.n % 100 == 0:
+                print(f"\r{tp.n}장 처리, {tp.rate:.1f} images/sec", end="", file=sys.stderr)
+            yield row
+
+    limits = Limits(max_bytes=int(args.max_image_mb * 2**20), max_pixels=int(args.max_image_mp * 1e6))
+    entries = iter_paths(args.inputs, limits.max_bytes)
+    rows = progress(classify_stream(learn, entries, fwd, prep, args.batch_size, args.workers, args.top_k,
+                                    args.fast_decode, limits, MemoryBudget(args.memory_budget_mb << 20)))
+    if args.out.endswith(".parquet"):
+        with open(args.out, "wb") as f: f.write(to_parquet_bytes(list(rows), args.top_k))
+    else:
+        write_csv(rows, args.out, args.top_k)
+    print(f"\r{tp.n}장 처리 완료, {tp.rate:.1f} images/sec → {args.out}", file=sys.stderr)
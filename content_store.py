@@ -0,0 +1,46 @@
+# content_store.py
+# 라벨별 콘텐츠(texts / images / videos)를 JSON 또는 SQLite 파일에서 읽음
+# JSON: {"라벨명" 또는 "#번호": {"texts": [...], "images": [...], "videos": [...]}}  ("_"로 시작하는 키는 무시)
+# SQLite: CREATE TABLE content (label TEXT, kind TEXT, pos INTEGER, value TEXT)
+import base64, json, os, sqlite3
+
+KINDS = ("texts", "images", "videos")
+
+def _load_json(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    return {k: {kind: list(v.get(kind, [])) for kind in KINDS} for k, v in raw.items() if not k.startswith("_")}
+
+def _load_sqlite(path: str) -> dict:
+    con = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = con.execute("SELECT label, kind, value FROM content ORDER BY label, kind, pos").fetchall()
+    finally:
+        con.close()
+    out: dict = {}
+    for label, kind, value in rows:
+        if kind in KINDS:
+            out.setdefault(label, {k: [] for k in KINDS})[kind].append(value)
+    return out
+
+def load_content(path: str) -> dict[str, dict[str, list[str]]]:
+    return _load_sqlite(path) if path.endswith((".sqlite", ".db")) else _load_json(path)
+
+def resolve_labels(content: dict, labels) -> dict:
+    """'#번호' 키를 learner.dls.vocab의 실제 라벨명으로 바꿈. 라벨명으로 적은 키가 우선."""
+    out = {}
+    for k, v in content.items():
+        if k.startswith("#") and k[1:].isdigit() and int(k[1:]) < len(labels):
+            out[labels[int(k[1:])]] = v
+    out.update({k: v for k, v in content.items() if not k.startswith("#")})
+    return out
+
+def is_remote(ref: str) -> bool:
+    return ref.startswith(("http://", "https://"))
+
+def read_local_image(ref: str, base_dir: str) -> bytes:
+    """data: URI 또는 콘텐츠 파일 기준 상대경로 → 바이트."""
+    if ref.startswith("data:"):
+        return base64.b64decode(ref.split(",", 1)[1])
+    with open(os.path.join(base_dir, ref), "rb") as f:
+        return f.read()
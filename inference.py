@@ -0,0 +1,267 @@
+# inference.py
+# 추론 관련 유틸 (Streamlit 없이도 import 가능)
+import hashlib, os, queue, threading, time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future
+from io import BytesIO
+import numpy as np
+import torch
+from PIL import Image, ImageOps
+from metrics import REGISTRY, SIZE_BUCKETS, percentile, timed
+
+# ======================
+# 예측 결과 캐시
+# ======================
+def model_fingerprint(path: str) -> str:
+    """모델 식별자: 절대경로 + 크기 + mtime. (수백 MB 파일 전체를 해시하지 않음)"""
+    s = os.stat(path)
+    return f"{os.path.abspath(path)}:{s.st_size}:{s.st_mtime_ns}"
+
+def image_key(img_bytes: bytes, model_id: str) -> str:
+    """업로드 바이트 해시 + 모델 식별자 → 캐시 키."""
+    h = hashlib.sha256(img_bytes)
+    h.update(b"\0" + model_id.encode())
+    return h.hexdigest()
+
+class PredictionCache:
+    """(pred, pred_idx, probs)를 보관하는 LRU + TTL 캐시. 모든 세션이 공유하므로 스레드 안전하게 동작."""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 3600.0):
+        self.maxsize, self.ttl = maxsize, ttl
+        self._data: OrderedDict[str, tuple[float, tuple]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and time.monotonic() - item[0] > self.ttl:
+                del self._data[key]
+                self.evictions += 1
+                item = None
+            if item is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: str, value: tuple):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key: str, fn):
+        """캐시에 있으면 반환, 없으면 fn()으로 계산 후 저장."""
+        value = self.get(key)
+        if value is None:
+            value = fn()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "hit_rate": self.hits / total if total else 0.0}
+
+# ======================
+# 디코딩 & 직접 텐서 전처리 (learner.predict / test_dl 우회)
+# ======================
+def decode_image(b: bytes, draft_size: tuple[int, int] | None = None, timings: dict | None = None) -> Image.Image:
+    """바이트 → RGB PIL. draft_size를 주면 JPEG은 디코딩 단계에서 1/2~1/8로 축소 (픽셀값이 미세하게 달라짐)."""
+    with timed("decode", timings):
+        pil = Image.open(BytesIO(b))
+        REGISTRY.observe("input_bytes", len(b), SIZE_BUCKETS)
+        REGISTRY.observe("input_pixels", pil.width * pil.height, SIZE_BUCKETS)
+        if draft_size and pil.format == "JPEG":
+            pil.draft("RGB", draft_size)
+        pil.load()
+    with timed("exif_transpose", timings):
+        pil = ImageOps.exif_transpose(pil)
+        if pil.mode != "RGB": pil = pil.convert("RGB")
+    return pil
+
+class TensorPreprocessor:
+    """learner.dls의 검증용 after_item/after_batch (Resize → ToTensor → IntToFloatTensor → Normalize)를 그대로 재현."""
+
+    def __init__(self, size: tuple[int, int], method: str, resample, div: float = 255.0, mean=None, std=None):
+        self.size, self.method, self.resample = tuple(size), method, resample  # size = (w, h)
+        self.div, self.mean, self.std = div, mean, std
+
+    @classmethod
+    def from_learner(cls, learner) -> "TensorPreprocessor | None":
+        """지원하지 않는 변환이 있으면 None (→ test_dl 경로로 처리)."""
+        resize = None
+        for t in learner.dls.after_item.fs:
+            name = type(t).__name__
+            if name == "Resize" and str(t.method) in ("crop", "squish"):
+                resize = t
+            elif name != "ToTensor":
+                return None
+        if resize is None: return None
+        div = mean = std = None
+        for t in learner.dls.after_batch.fs:
+            name = type(t).__name__
+            if getattr(t, "split_idx", None) == 0: continue  # 학습 전용 증강은 추론 시 적용 안 됨
+            if name == "IntToFloatTensor": div = t.div
+            elif name == "Normalize": mean, std = t.mean.cpu(), t.std.cpu()
+            else: return None
+        if div is None: return None
+        return cls(resize.size, str(resize.method), resize.mode, div, mean, std)
+
+    @property
+    def draft_size(self) -> tuple[int, int]:
+        # EXIF 회전 전이라 가로/세로가 바뀔 수 있으므로 긴 변 기준
+        m = max(self.size)
+        return (m, m)
+
+    def resize(self, img: Image.Image) -> Image.Image:
+        w, h = img.size
+        sw, sh = self.size
+        if self.method == "squish":
+            return img.resize((sw, sh), self.resample)
+        # fastai Resize(method='crop') 검증 모드: 중앙 크롭 후 리사이즈
+        m = w / sw if w / sw < h / sh else h / sh
+        cw, ch = int(m * sw), int(m * sh)
+        l, t = int(0.5 * (w - cw)), int(0.5 * (h - ch))
+        return img.crop((l, t, l + cw, t + ch)).resize((sw, sh), self.resample)
+
+    def __call__(self, imgs: list) -> torch.Tensor:
+        arrs = [np.asarray(self.resize(im if im.mode == "RGB" else im.convert("RGB"))) for im in imgs]
+        x = torch.from_numpy(np.stack(arrs)).permute(0, 3, 1, 2).float().div_(self.div)
+        if self.mean is not None:
+            x = (x - self.mean) / self.std
+        return x
+
+# ======================
+# 마이크로 배칭 추론 엔진
+# ======================
+def batch_predict(learner, items: list, forward=None, preprocess=None, timings: dict | None = None) -> list[tuple]:
+    """items(PIL 이미지 리스트)를 한 번의 배치 forward로 예측. learner.predict와 같은 (pred, pred_idx, probs) 형식.
+    timings를 주면 preprocess / forward / postprocess 소요시간을 기록."""
+    with timed("preprocess", timings):
+        if preprocess is not None:
+            xb = preprocess(items)
+        else:
+            from fastai.vision.all import PILImage
+            dl = learner.dls.test_dl([PILImage.create(np.array(i)) for i in items], bs=len(items), num_workers=0)
+            xb = dl.one_batch()[0]
+    with timed("forward", timings), torch.inference_mode():
+        logits = (forward or learner.model)(xb)
+    with timed("postprocess", timings):
+        act = getattr(learner.loss_func, "activation", None)
+        probs = act(logits) if act is not None else torch.softmax(logits, dim=1)
+        dec = getattr(learner.loss_func, "decodes", None)
+        idxs = dec(probs) if dec is not None else probs.argmax(dim=1)
+        vocab = learner.dls.vocab
+        return [(vocab[int(i)], i, p) for i, p in zip(idxs, probs)]
+
+def check_parity(learner, images: list, atol: float = 1e-5) -> dict:
+    """직접 전처리 경로와 learner.predict 결과 비교. 배포 전 확인용."""
+    from fastai.vision.all import PILImage
+    prep = TensorPreprocessor.from_learner(learner)
+    if prep is None:
+        return {"supported": False}
+    learner.model.eval()
+    fast = batch_predict(learner, images, preprocess=prep)
+    max_diff, same_label = 0.0, 0
+    for img, (pred, _, probs) in zip(images, fast):
+        ref_pred, _, ref_probs = learner.predict(PILImage.create(np.array(img)))
+        max_diff = max(max_diff, float((probs - ref_probs).abs().max()))
+        same_label += str(pred) == str(ref_pred)
+    return {"supported": True, "n": len(images), "same_label": same_label,
+            "max_abs_diff": max_diff, "ok": same_label == len(images) and max_diff <= atol}
+
+class MicroBatcher:
+    """여러 세션의 요청을 모아 max_batch 또는 max_wait_ms 기준으로 배치 처리. 결과는 Future로 전달.
+    predict_batch(items, timings)는 배치 단계별 소요시간을 timings에 기록 (batch_predict의 timings 인자).
+    끝난 Future의 .timings에 그 요청의 queue_wait + 배치 단계별 소요시간 + batch_size가 들어 있음."""
+
+    def __init__(self, predict_batch, max_batch: int = 8, max_wait_ms: float = 10.0, window: int = 1024):
+        self.predict_batch = predict_batch
+        self.max_batch, self.max_wait = max(1, max_batch), max_wait_ms / 1000
+        self._q: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.batch_sizes: Counter = Counter()
+        self.latencies: deque = deque(maxlen=window)
+        self.requests = self.errors = 0
+        self._thread = threading.Thread(target=self._loop, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, item) -> Future:
+        fut: Future = Future()
+        self._q.put((item, fut, time.perf_counter()))
+        return fut
+
+    def predict(self, item, timeout: float | None = None):
+        return self.submit(item).result(timeout)
+
+    def close(self):
+        self._q.put(None)
+        self._thread.join()
+
+    def _collect(self, first) -> list:
+        batch, deadline = [first], time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0: break
+            try:
+                nxt = self._q.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if nxt is None:
+                self._q.put(None)  # 종료 신호는 다음 루프에서 처리
+                break
+            batch.append(nxt)
+        # 취소된 요청은 버림
+        return [r for r in batch if r[1].set_running_or_notify_cancel()]
+
+    def _loop(self):
+        while True:
+            first = self._q.get()
+            if first is None: return
+            batch = self._collect(first)
+            if not batch: continue
+            try:
+                started, timings = time.perf_counter(), {}
+                results = self.predict_batch([item for item, _, _ in batch], timings)
+            except Exception as e:
+                with self._lock: self.errors += len(batch)
+                for _, fut, _ in batch: fut.set_exception(e)
+                continue
+            now = time.perf_counter()
+            with self._lock:
+                self.batch_sizes[len(batch)] += 1
+                self.requests += len(batch)
+                self.latencies.extend(now - t0 for _, _, t0 in batch)
+            for _, _, t0 in batch:
+                REGISTRY.observe("inference_latency_seconds", now - t0)
+            for (_, fut, t0), res in zip(batch, results):
+                fut.timings = {"queue_wait": started - t0, **timings, "batch_size": len(batch)}
+                fut.set_result(res)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lat = list(self.latencies)
+            return {"queue_depth": self._q.qsize(), "requests": self.requests, "errors": self.errors,
+                    "batch_size_hist": dict(sorted(self.batch_sizes.items())),
+                    "p50_ms": percentile(lat, 50) * 1000, "p99_ms": percentile(lat, 99) * 1000}
+
+if __name__ == "__main__":
+    # python inference.py model.pkl img1.jpg img2.png ...  → 전처리 경로 정합성 확인
+    import json, sys
+    from fastai.vision.all import load_learner
+    learn = load_learner(sys.argv[1], cpu=True)
+    imgs = [decode_image(open(f, "rb").read()) for f in sys.argv[2:]]
+    res = check_parity(learn, imgs)
+    print(json.dumps(res, ensure_ascii=False))
+    sys.exit(0 if res.get("ok") else 1)
@@ -0,0 +1,156 @@
+# ingest.py
+# 업로드 이미지 수집: 헤더만 읽어 크기 확인 → 디코딩 → 모델 입력 + 미리보기만 남기고 원본 바이트·픽셀은 버림
+# 동시에 디코딩 중인 이미지의 예상 메모리 합계는 프로세스 전체 예산(MemoryBudget)으로 제한
+import threading, time
+from contextlib import contextmanager
+from io import BytesIO
+from typing import NamedTuple
+from PIL import Image
+from inference import decode_image
+from metrics import REGISTRY, SIZE_BUCKETS, timed
+
+class IngestError(ValueError):
+    """거부된 입력. 메시지는 그대로 사용자에게 보여줌."""
+
+class ImageInfo(NamedTuple):
+    format: str | None
+    width: int
+    height: int
+    mode: str
+    frames: int
+
+class Ingested(NamedTuple):
+    key: str                  # 원본 바이트 해시 + 모델 식별자 (예측 캐시 키)
+    info: ImageInfo           # 원본 헤더 정보
+    preview: bytes            # st.image용 JPEG (긴 변 preview_max 이하)
+    model_input: Image.Image  # 모델 입력 크기로 줄인 RGB 이미지
+    flagged: bool             # 큰 입력 (flag_pixels 초과)
+    nbytes: int               # 세션에 남는 대략적인 크기
+
+class Limits(NamedTuple):
+    max_bytes: int = 20 << 20      # 업로드 파일 크기 상한
+    max_pixels: int = 50_000_000   # 이보다 크면 거부
+    flag_pixels: int = 12_000_000  # 이보다 크면 '큰 입력'으로 표시
+    preview_max: int = 1024        # 미리보기 긴 변
+
+def probe(b: bytes) -> ImageInfo:
+    """픽셀 디코딩 없이 헤더만 읽음."""
+    try:
+        img = Image.open(BytesIO(b))
+    except Image.DecompressionBombError:
+        raise IngestError("이미지 해상도가 너무 큽니다.")
+    except Exception:
+        raise IngestError("이미지 파일을 읽을 수 없습니다.")
+    return ImageInfo(img.format, img.width, img.height, img.mode, getattr(img, "n_frames", 1))
+
+def draft_scale(info: ImageInfo, draft_size: tuple[int, int] | None) -> int:
+    """PIL JPEG draft가 고르는 축소 배율 (1/2/4/8). JPEG이 아니면 1."""
+    if not draft_size or info.format != "JPEG": return 1
+    scale = min(info.width // draft_size[0], info.height // draft_size[1])
+    return next((s for s in (8, 4, 2) if s <= scale), 1)
+
+def estimate_decode_bytes(info: ImageInfo, draft_size: tuple[int, int] | None) -> int:
+    """디코딩 중 최대 메모리 추정: RGBA 기준 픽셀 버퍼 × 2 (EXIF 회전/RGB 변환 사본)."""
+    s = draft_scale(info, draft_size)
+    return (info.width // s) * (info.height // s) * 4 * 2
+
+# ======================
+# 프로세스 메모리 예산
+# ======================
+class MemoryBudget:
+    """동시에 디코딩 중인 이미지들의 예상 메모리 합계를 max_bytes 이하로 유지. 자리가 없으면 timeout까지 대기."""
+
+    def __init__(self, max_bytes: int = 512 << 20, timeout: float = 30.0):
+        self.max_bytes, self.timeout = max_bytes, timeout
+        self._cond = threading.Condition()
+        self.in_use = self.peak = 0
+        self.waits = self.rejected = 0
+
+    @contextmanager
+    def reserve(self, nbytes: int):
+        if nbytes > self.max_bytes:
+            with self._cond: self.rejected += 1
+            raise IngestError("이미지가 너무 커서 처리할 수 없습니다.")
+        with self._cond:
+            if self.in_use + nbytes > self.max_bytes:
+                self.waits += 1
+                if not self._cond.wait_for(lambda: self.in_use + nbytes <= self.max_bytes, self.timeout):
+                    self.rejected += 1
+                    raise IngestError("서버가 바쁩니다. 잠시 후 다시 시도하세요.")
+            self.in_use += nbytes
+            self.peak = max(self.peak, self.in_use)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_use -= nbytes
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"max_bytes": self.max_bytes, "in_use_bytes": self.in_use, "peak_bytes": self.peak,
+                    "waits": self.waits, "rejected": self.rejected}
+
+# ======================
+# 수집
+# ======================
+def check(b: bytes, limits: Limits = Limits()) -> ImageInfo:
+    """파일 크기·헤더의 해상도가 상한 이내인지 확인 (픽셀은 디코딩하지 않음)."""
+    try:
+        if len(b) > limits.max_bytes:
+            raise IngestError(f"파일이 너무 큽니다 ({len(b) / 2**20:.1f}MB > {limits.max_bytes / 2**20:.0f}MB).")
+        info = probe(b)
+        if info.width * info.height > limits.max_pixels:
+            raise IngestError(f"해상도가 너무 큽니다 ({info.width}×{info.height}).")
+    except IngestError:
+        REGISTRY.inc("ingest_rejected_total")
+        raise
+    return info
+
+def decode_bounded(b: bytes, budget: MemoryBudget, limits: Limits = Limits(), draft_size=None, resize=None,
+                   timings: dict | None = None):
+    """check → 예산 안에서 (draft) 디코딩 → resize (원본 해상도 이미지는 예산 안에서만 존재).
+    (원본 헤더 정보, RGB 이미지, 큰 입력 여부) 반환. 일괄 분류용."""
+    info = check(b, limits)
+    try:
+        with budget.reserve(estimate_decode_bytes(info, draft_size)):
+            img = decode_image(b, draft_size, timings)
+            if resize is not None: img = resize(img)
+    except IngestError:
+        REGISTRY.inc("ingest_rejected_total")
+        raise
+    except Exception as e:
+        REGISTRY.inc("ingest_rejected_total")
+        raise IngestError("이미지를 디코딩할 수 없습니다.") from e
+    return info, img, info.width * info.height > limits.flag_pixels
+
+def ingest(b: bytes, key: str, budget: MemoryBudget, limits: Limits = Limits(), preprocess=None,
+           fast_decode: bool = False, timings: dict | None = None) -> Ingested:
+    """검사 → 디코딩 → (미리보기 JPEG, 모델 입력 이미지). IngestError면 거부.
+    preprocess가 없으면 (test_dl 경로) 모델 입력은 미리보기 크기 이미지 (원본 해상도를 세션에 남기지 않음)."""
+    info = check(b, limits)
+    flagged = info.width * info.height > limits.flag_pixels
+    # fast_decode면 JPEG을 디코딩 단계에서 모델 입력 크기까지 축소 (draft). 아니면 원본 해상도로 디코딩해
+    # learner.predict·일괄 분류와 같은 모델 입력을 만듦 (원본은 예산 안에서만 존재하고 곧 버림)
+    draft = preprocess.draft_size if (fast_decode and preprocess is not None) else None
+    t0 = time.perf_counter()
+    try:
+        with budget.reserve(estimate_decode_bytes(info, draft)), timed("ingest", timings):
+            img = decode_image(b, draft, timings)
+            model_input = preprocess.resize(img) if preprocess is not None else None
+            img.thumbnail((limits.preview_max, limits.preview_max))
+            if model_input is None: model_input = img
+            buf = BytesIO()
+            img.save(buf, "JPEG", quality=85)
+    except IngestError:
+        REGISTRY.inc("ingest_rejected_total")
+        raise
+    except Exception as e:
+        REGISTRY.inc("ingest_rejected_total")
+        raise IngestError("이미지를 디코딩할 수 없습니다.") from e
+    REGISTRY.observe("ingest_wall_seconds", time.perf_counter() - t0)
+    preview = buf.getvalue()
+    nbytes = len(preview) + model_input.width * model_input.height * 3
+    REGISTRY.observe("ingest_retained_bytes", nbytes, SIZE_BUCKETS)
+    if flagged: REGISTRY.inc("ingest_flagged_total")
+    return Ingested(key, info, preview, model_input, flagged, nbytes)
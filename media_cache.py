@@ -0,0 +1,205 @@
+# media_cache.py
+# 라벨 콘텐츠 이미지 썸네일 캐시: 로컬 이미지는 원본 바이트 해시, 원격 이미지는 URL 해시를 파일명으로
+# 카드 크기로 한 번만 줄여서 static/ 아래에 저장 (용량 상한을 넘으면 오래 안 쓴 원격 썸네일부터 삭제)
+# 로컬 콘텐츠 썸네일은 고정(pin): 페이지 URL이 캐시된 콘텐츠에 들어가 있으므로 삭제하지 않음
+# Streamlit 정적 파일 서빙(.streamlit/config.toml의 enableStaticServing)으로 app/static/... 경로에서 제공
+import hashlib, os, tempfile, threading, time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+from PIL import Image, ImageOps
+
+CARD_WIDTH = 480  # .thumb 카드(4/12칸) 폭의 약 2배 (고해상도 화면 대비)
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+def make_thumbnail(raw: bytes, width: int = CARD_WIDTH, quality: int = 80) -> bytes:
+    """폭이 width보다 크면 비율 유지해 축소 후 WebP로 다시 인코딩."""
+    img = ImageOps.exif_transpose(Image.open(BytesIO(raw)))
+    if img.mode not in ("RGB", "RGBA"): img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+    if img.width > width: img.thumbnail((width, width * 4), Image.LANCZOS)
+    buf = BytesIO()
+    img.save(buf, "WEBP", quality=quality, method=4)
+    return buf.getvalue()
+
+class ThumbnailCache:
+    """원본 → 썸네일 파일. 디스크 LRU (접근 시 mtime 갱신, 재시작 후에도 순서 유지). 고정된 파일은 LRU 밖에서 관리."""
+
+    def __init__(self, subdir: str = "thumbs", width: int = CARD_WIDTH, quality: int = 80,
+                 max_bytes: int = 200 << 20, static_dir: str = STATIC_DIR):
+        self.root = os.path.join(static_dir, subdir)
+        self.url_prefix = f"app/static/{subdir}"
+        self.width, self.quality, self.max_bytes = width, quality, max_bytes
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        files = [e for e in os.scandir(self.root) if e.is_file() and e.name.endswith(".webp")]
+        files.sort(key=lambda e: e.stat().st_mtime)
+        self._lru: OrderedDict[str, int] = OrderedDict((e.name, e.stat().st_size) for e in files)
+        self.total_bytes = sum(self._lru.values())
+        self._pinned: dict[str, int] = {}
+        self.evictions = 0
+
+    def _name(self, key: bytes) -> str:
+        h = hashlib.sha256(key)
+        h.update(f":{self.width}:{self.quality}".encode())
+        return h.hexdigest()[:24] + ".webp"
+
+    def name_for(self, raw: bytes) -> str:
+        return self._name(raw)
+
+    def name_for_url(self, url: str) -> str:
+        return self._name(b"url:" + url.encode())
+
+    def url(self, name: str) -> str:
+        return f"{self.url_prefix}/{name}"
+
+    def exists(self, url: str) -> bool:
+        """이 캐시가 만든 URL의 파일이 디스크에 아직 있는지 (다른 URL이면 True)."""
+        if not url.startswith(self.url_prefix + "/"): return True
+        return os.path.exists(os.path.join(self.root, url[len(self.url_prefix) + 1:]))
+
+    def _hit(self, name: str) -> bool:
+        with self._lock:
+            if name not in self._lru: return False
+            self._lru.move_to_end(name)
+        try:
+            os.utime(os.path.join(self.root, name))
+        except FileNotFoundError:
+            with self._lock: self._lru.pop(name, None)
+            return False
+        return True
+
+    def _pin(self, name: str) -> bool:
+        """이미 있는 파일을 LRU에서 빼서 고정. 파일이 없으면 False."""
+        path = os.path.join(self.root, name)
+        if not os.path.exists(path):
+            with self._lock:
+                self.total_bytes -= self._lru.pop(name, 0)
+                self._pinned.pop(name, None)
+            return False
+        with self._lock:
+            if name not in self._pinned:
+                self.total_bytes -= self._lru.pop(name, 0)
+                self._pinned[name] = os.path.getsize(path)
+        return True
+
+    def _write(self, name: str, data: bytes, pin: bool = False):
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".part")
+        with os.fdopen(fd, "wb") as f: f.write(data)
+        os.replace(tmp, os.path.join(self.root, name))
+        with self._lock:
+            self.total_bytes -= self._lru.pop(name, 0)
+            if pin:
+                self._pinned[name] = len(data)
+                return
+            self._pinned.pop(name, None)
+            self.total_bytes += len(data)
+            self._lru[name] = len(data)
+            while self.total_bytes > self.max_bytes and len(self._lru) > 1:
+                old, size = self._lru.popitem(last=False)
+                self.total_bytes -= size
+                self.evictions += 1
+                try: os.remove(os.path.join(self.root, old))
+                except FileNotFoundError: pass
+
+    def put(self, raw: bytes, pin: bool = True) -> str:
+        """썸네일을 (없으면) 만들고 페이지에서 쓸 URL 반환. pin이면 용량 상한으로 삭제되지 않음 (로컬 콘텐츠용)."""
+        name = self.name_for(raw)
+        if not (self._pin(name) if pin else self._hit(name)):
+            self._write(name, make_thumbnail(raw, self.width, self.quality), pin)
+        return self.url(name)
+
+    def lookup_url(self, url: str) -> str | None:
+        """원격 URL의 썸네일이 캐시에 있으면 로컬 URL."""
+        name = self.name_for_url(url)
+        return self.url(name) if self._hit(name) else None
+
+    def put_remote(self, url: str, raw: bytes) -> str:
+        name = self.name_for_url(url)
+        self._write(name, make_thumbnail(raw, self.width, self.quality))
+        return self.url(name)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"files": len(self._lru), "bytes": self.total_bytes, "max_bytes": self.max_bytes,
+                    "pinned_files": len(self._pinned), "pinned_bytes": sum(self._pinned.values()),
+                    "evictions": self.evictions}
+
+# ======================
+# 원격 이미지 가져오기
+# ======================
+class HttpFetcher:
+    """연결 풀을 재사용하는 HTTP 클라이언트. fetcher는 url → bytes 호출 가능 객체면 무엇이든 됨 (테스트용 대체 가능)."""
+
+    def __init__(self, timeout: float = 10.0, pool_size: int = 8, max_bytes: int = 20 << 20):
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.timeout, self.max_bytes = timeout, max_bytes
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = "Mozilla/5.0 (thumbnail-cache)"
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=1)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def __call__(self, url: str) -> bytes:
+        with self.session.get(url, timeout=self.timeout, stream=True) as r:
+            r.raise_for_status()
+            data = bytearray()
+            for chunk in r.iter_content(64 << 10):
+                data += chunk
+                if len(data) > self.max_bytes:
+                    raise ValueError(f"이미지가 너무 큽니다: {url}")
+            return bytes(data)
+
+class MediaProxy:
+    """원격 이미지 URL → 로컬 썸네일 URL. 캐시에 없으면 백그라운드로 받아 두고, 이번 렌더에는 원본 URL을 그대로 사용."""
+
+    def __init__(self, cache: ThumbnailCache, fetcher=None, workers: int = 4, retry_after: float = 300.0):
+        self.cache, self.fetcher = cache, fetcher or HttpFetcher(pool_size=workers)
+        self.retry_after = retry_after
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="media-fetch")
+        self._lock = threading.Lock()
+        self._inflight: dict[str, Future] = {}
+        self._failed: dict[str, float] = {}
+        self.fetches = self.failures = 0
+
+    def fetch(self, url: str) -> str | None:
+        """동기 버전: 받아서 썸네일로 저장하고 로컬 URL 반환 (실패하면 None)."""
+        local = self.cache.lookup_url(url)
+        if local: return local
+        try:
+            local = self.cache.put_remote(url, self.fetcher(url))
+        except Exception:
+            with self._lock:
+                self.failures += 1
+                self._failed[url] = time.monotonic()
+            return None
+        with self._lock: self.fetches += 1
+        return local
+
+    def _done(self, url: str):
+        with self._lock: self._inflight.pop(url, None)
+
+    def prefetch(self, urls) -> list[Future]:
+        futs = []
+        with self._lock:
+            now = time.monotonic()
+            for url in urls:
+                if not url or url in self._inflight: continue
+                if now - self._failed.get(url, -self.retry_after) < self.retry_after: continue
+                self._inflight[url] = fut = self._pool.submit(self.fetch, url)
+                futs.append((url, fut))
+        for url, fut in futs:  # 이미 끝났으면 콜백이 바로 실행되므로 락 밖에서 등록
+            fut.add_done_callback(lambda _, u=url: self._done(u))
+        return [fut for _, fut in futs]
+
+    def url_for(self, url: str) -> str:
+        """렌더용: 캐시에 있으면 로컬 URL, 없으면 백그라운드 요청 후 원본 URL."""
+        local = self.cache.lookup_url(url)
+        if local: return local
+        self.prefetch([url])
+        return url
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.cache.stats(), "inflight": len(self._inflight), "fetches": self.fetches,
+                    "failures": self.failures}
@@ -0,0 +1,192 @@
+# metrics.py
+# 단계별 지연시간·입력 크기·메모리 계측. 프로세스 전체에서 REGISTRY 하나를 공유 (모든 세션 합산)
+# 내보내기: Prometheus 텍스트 형식 / JSON 스냅샷 / 요청당 JSON 로그 한 줄
+import json, logging, os, resource, threading, time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+log = logging.getLogger("classifier.metrics")
+
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = tuple(float(4 ** i * 1024) for i in range(1, 12))  # 4KB ~ 4GB (바이트·픽셀 수)
+
+def percentile(values, q: float) -> float:
+    if not values: return 0.0
+    v = sorted(values)
+    return v[min(len(v) - 1, int(round(q / 100 * (len(v) - 1))))]
+
+class Histogram:
+    """Prometheus식 누적 버킷 + 최근 window개 값(백분위수 계산용)."""
+
+    def __init__(self, buckets=TIME_BUCKETS, window: int = 2048):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum, self.count = 0.0, 0
+        self.recent: deque = deque(maxlen=window)
+
+    def observe(self, v: float):
+        self.counts[bisect_left(self.buckets, v)] += 1
+        self.sum += v
+        self.count += 1
+        self.recent.append(v)
+
+    def summary(self) -> dict:
+        r = list(self.recent)
+        return {"count": self.count, "sum": self.sum, "p50": percentile(r, 50), "p90": percentile(r, 90),
+                "p99": percentile(r, 99), "max": max(r) if r else 0.0}
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms: dict[str, Histogram] = {}
+        self.counters: dict[str, float] = {}
+        self.gauges: dict[str, float] = {}
+        self._collectors: dict[str, object] = {}
+
+    def observe(self, name: str, value: float, buckets=TIME_BUCKETS):
+        with self._lock:
+            h = self.histograms.get(name)
+            if h is None: h = self.histograms[name] = Histogram(buckets)
+            h.observe(value)
+
+    def inc(self, name: str, n: float = 1):
+        with self._lock: self.counters[name] = self.counters.get(name, 0) + n
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock: self.gauges[name] = float(value)
+
+    def register_collector(self, name: str, fn):
+        """fn() → {이름: 숫자} (캐시·배처 통계 등). 내보낼 때마다 호출해 게이지로 포함. 같은 이름은 덮어씀."""
+        with self._lock: self._collectors[name] = fn
+
+    def _collected(self) -> dict[str, float]:
+        out = {}
+        for prefix, fn in list(self._collectors.items()):
+            try:
+                for k, v in fn().items():
+                    if isinstance(v, (int, float)) and not isinstance(v, bool): out[f"{prefix}_{k}"] = float(v)
+            except Exception:
+                log.exception("collector %s 실패", prefix)
+        return out
+
+    def snapshot(self) -> dict:
+        self.set_gauge("process_rss_bytes", rss_bytes())
+        collected = self._collected()
+        with self._lock:
+            return {"histograms": {k: h.summary() for k, h in self.histograms.items()},
+                    "counters": dict(self.counters), "gauges": {**self.gauges, **collected}}
+
+    def prometheus_text(self, prefix: str = "classifier") -> str:
+        self.set_gauge("process_rss_bytes", rss_bytes())
+        collected = self._collected()
+        lines = []
+        with self._lock:
+            for k, v in sorted(self.counters.items()):
+                lines += [f"# TYPE {prefix}_{k} counter", f"{prefix}_{k} {v}"]
+            for k, v in sorted({**self.gauges, **collected}.items()):
+                lines += [f"# TYPE {prefix}_{k} gauge", f"{prefix}_{k} {v}"]
+            for k, h in sorted(self.histograms.items()):
+                name, acc = f"{prefix}_{k}", 0
+                lines.append(f"# TYPE {name} histogram")
+                for b, c in zip(h.buckets, h.counts):
+                    acc += c
+                    lines.append(f'{name}_bucket{{le="{b:.10g}"}} {acc}')
+                lines += [f'{name}_bucket{{le="+Inf"}} {h.count}', f"{name}_sum {h.sum}", f"{name}_count {h.count}"]
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Metrics()
+
+def rss_bytes() -> int:
+    """현재 RSS (리눅스는 /proc, 그 외에는 최대 RSS로 대체)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+@contextmanager
+def timed(stage: str, timings: dict | None = None):
+    """stage 소요시간을 stage_<이름>_seconds 히스토그램에 기록 (timings를 주면 요청별 기록에도 추가)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        REGISTRY.observe(f"stage_{stage}_seconds", dt)
+        if timings is not None: timings[stage] = timings.get(stage, 0.0) + dt
+
+def enable_request_log(stream=None):
+    """요청 로그를 stderr(또는 stream)로 한 줄씩 출력. 여러 번 불러도 핸들러는 하나."""
+    if not log.handlers:
+        h = logging.StreamHandler(stream)
+        h.setFormatter(logging.Formatter("%(message)s"))
+        log.addHandler(h)
+    log.setLevel(logging.INFO)
+    log.propagate = False
+
+def log_request(record: dict):
+    """요청당 JSON 한 줄 로그."""
+    log.info(json.dumps({"ts": time.time(), "rss_bytes": rss_bytes(), **record}, ensure_ascii=False, default=str))
+
+# ======================
+# 샘플링 프로파일러 (요청 단위로 켬)
+# ======================
+@contextmanager
+def profile_request(enabled: bool, out: dict):
+    """enabled면 블록 실행을 프로파일링해서 out["html"] (pyinstrument) 또는 out["text"] (cProfile)에 저장."""
+    if not enabled:
+        yield
+        return
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        Profiler = None
+    if Profiler is not None:
+        p = Profiler(interval=0.001)
+        p.start()
+        try:
+            yield
+        finally:
+            p.stop()
+            out["html"] = p.output_html()
+        return
+    import cProfile, io, pstats
+    p = cProfile.Profile()
+    p.enable()
+    try:
+        yield
+    finally:
+        p.disable()
+        buf = io.StringIO()
+        pstats.Stats(p, stream=buf).sort_stats("cumulative").print_stats(40)
+        out["text"] = buf.getvalue()
+
+# ======================
+# /metrics HTTP 엔드포인트 (선택)
+# ======================
+def start_metrics_server(port: int, host: str = "0.0.0.0"):
+    """별도 포트에서 GET /metrics (Prometheus), GET /metrics.json 제공. 데몬 스레드."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, ctype = REGISTRY.prometheus_text().encode(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, ctype = json.dumps(REGISTRY.snapshot()).encode(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,224 @@
+# model_store.py
+# 모델 아티팩트 관리: 소스(로컬 경로 / file:// · HTTP 미러 / Google Drive) → 임시파일에 다운로드 → SHA-256 검증
+# → 원자적 rename으로 버전별 캐시 디렉터리에 저장. 부분 다운로드된 파일이 정상 모델로 쓰이는 일이 없도록 함.
+import hashlib, logging, os, shutil, tempfile, threading, time, urllib.request, zipfile
+from PIL import Image
+
+log = logging.getLogger("classifier.model_store")
+
+class ChecksumError(Exception):
+    pass
+
+def sha256_file(path: str, chunk: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(chunk):
+            h.update(block)
+    return h.hexdigest()
+
+# ======================
+# 소스
+# ======================
+class LocalSource:
+    """로컬 파일 (오프라인 대체용)."""
+    def __init__(self, path: str): self.path = path
+    def __repr__(self): return f"LocalSource({self.path!r})"
+    def revision(self) -> str | None:
+        s = os.stat(self.path)
+        return f"{s.st_size}:{s.st_mtime_ns}"
+    def fetch(self, dest: str):
+        shutil.copyfile(self.path, dest)
+
+class HTTPSource:
+    """http(s):// 미러 또는 file:// URL."""
+    def __init__(self, url: str, timeout: float = 60.0): self.url, self.timeout = url, timeout
+    def __repr__(self): return f"HTTPSource({self.url!r})"
+    def revision(self) -> str | None:
+        """HEAD 응답의 ETag / Last-Modified + Content-Length (file://은 크기 + mtime). 알 수 없으면 None."""
+        if self.url.startswith("file://"):
+            return LocalSource(urllib.request.url2pathname(self.url[len("file://"):])).revision()
+        req = urllib.request.Request(self.url, method="HEAD")
+        with urllib.request.urlopen(req, timeout=self.timeout) as r:
+            etag, modified, length = r.headers.get("ETag"), r.headers.get("Last-Modified"), r.headers.get("Content-Length")
+        if etag: return etag
+        return f"{modified}:{length}" if modified else None
+    def fetch(self, dest: str):
+        with urllib.request.urlopen(self.url, timeout=self.timeout) as r, open(dest, "wb") as f:
+            shutil.copyfileobj(r, f, 1 << 20)
+
+class DriveSource:
+    """Google Drive 파일 ID (gdown). 내용이 바뀌었는지 싸게 알 방법이 없으므로 revision은 None."""
+    def __init__(self, file_id: str): self.file_id = file_id
+    def __repr__(self): return f"DriveSource({self.file_id!r})"
+    def revision(self) -> str | None:
+        return None
+    def fetch(self, dest: str):
+        import gdown
+        if gdown.download(f"https://drive.google.com/uc?id={self.file_id}", dest, quiet=True) is None:
+            raise RuntimeError(f"Drive 다운로드 실패: {self.file_id}")
+
+def source_from_uri(uri: str):
+    """'gdrive:<id>' / 'http(s)://...' / 'file://...' / 로컬 경로 → 소스 객체."""
+    if uri.startswith("gdrive:"): return DriveSource(uri[len("gdrive:"):])
+    if uri.startswith(("http://", "https://", "file://")): return HTTPSource(uri)
+    return LocalSource(uri)
+
+# ======================
+# 저장소
+# ======================
+def _short_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+def check_archive(path: str):
+    """해시 없이 받은 파일의 최소 검사: torch.save(zip) 형식인데 zip으로 열리지 않으면 잘린 파일."""
+    with open(path, "rb") as f:
+        magic = f.read(4)
+    if not magic:
+        raise ChecksumError("빈 모델 파일")
+    if magic == b"PK\x03\x04" and not zipfile.is_zipfile(path):
+        raise ChecksumError("잘린 모델 파일 (zip 끝부분 없음)")
+
+class ModelStore:
+    """<cache_dir>/<version>/<filename> 형태의 버전별 로컬 캐시. 검증된 해시는 옆에 .sha256 파일로 기록.
+    버전을 정하는 방법 (fetch의 version=None일 때):
+      - sha256을 주면 해시 앞 16자. 모든 소스의 결과를 이 해시로 검증
+      - 없으면 소스별 revision (로컬 크기+mtime, HTTP ETag 등) → 원본이 바뀌면 새 버전으로 다시 받음
+      - revision도 모르는 소스 (해시 없는 Drive)는 처음 받아 둔 사본을 계속 사용. refresh="background"면 그 사본을
+        바로 쓰면서 백그라운드로 다시 받아 내용이 바뀌었을 때만 교체 (다음 프로세스부터 적용), "now"면 지금 다시 받음"""
+
+    def __init__(self, cache_dir: str = ".model_cache", filename: str = "model.pkl"):
+        self.cache_dir, self.filename = cache_dir, filename
+        self.pending_refresh = None  # fetch가 캐시를 쓰면서 미뤄 둔 (소스, 경로)
+
+    def path_for(self, version: str) -> str:
+        return os.path.join(self.cache_dir, version, self.filename)
+
+    def _verify(self, path: str, sha256: str | None) -> str:
+        digest = sha256_file(path)
+        if sha256 and digest != sha256.lower():
+            raise ChecksumError(f"SHA-256 불일치: {digest} != {sha256}")
+        return digest
+
+    def _cached(self, path: str, sha256: str | None) -> bool:
+        """캐시된 파일이 기대 해시(없으면 처음 받을 때 기록한 해시)와 같은지 확인. 다르면 삭제."""
+        if not os.path.exists(path): return False
+        expected = sha256
+        if expected is None and os.path.exists(path + ".sha256"):
+            expected = open(path + ".sha256").read().strip()
+        try:
+            self._verify(path, expected)
+            return True
+        except ChecksumError:
+            os.remove(path)
+            return False
+
+    def _download(self, src, dest: str, sha256: str | None, timings: dict):
+        """임시파일로 받아 검증 후 dest로 원자적 rename. 이미 같은 내용이면 그대로 둠 (mtime이 바뀌지 않게)."""
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest), suffix=".part")
+        os.close(fd)
+        try:
+            t0 = time.perf_counter()
+            src.fetch(tmp)
+            t1 = time.perf_counter()
+            if sha256 is None: check_archive(tmp)
+            digest = self._verify(tmp, sha256)
+            timings.update(source=repr(src), download_s=t1 - t0, verify_s=time.perf_counter() - t1)
+            if os.path.exists(dest) and os.path.exists(dest + ".sha256") \
+                    and open(dest + ".sha256").read().strip() == digest:
+                return
+            with open(tmp + ".sha256", "w") as f: f.write(digest)
+            os.replace(tmp + ".sha256", dest + ".sha256")
+            os.replace(tmp, dest)
+        finally:
+            for p in (tmp, tmp + ".sha256"):
+                if os.path.exists(p): os.remove(p)
+
+    def start_refresh(self) -> threading.Thread | None:
+        """fetch가 미뤄 둔 백그라운드 새로고침 시작 (캐시된 파일을 다 읽은 뒤 호출)."""
+        if self.pending_refresh is None: return None
+        src, dest = self.pending_refresh
+        self.pending_refresh = None
+        return self.refresh_async(src, dest)
+
+    def refresh_async(self, src, dest: str) -> threading.Thread:
+        """src를 백그라운드로 다시 받아 내용이 다를 때만 dest를 교체. 실패는 로그만 남김."""
+        def run():
+            t = {}
+            try:
+                self._download(src, dest, None, t)
+                log.info("모델 새로고침 확인 완료: %r (%.1fs)", src, t.get("download_s", 0.0))
+            except Exception:
+                log.exception("모델 새로고침 실패: %r", src)
+        th = threading.Thread(target=run, name="model-refresh", daemon=True)
+        th.start()
+        return th
+
+    def fetch(self, sources: list, version: str | None = None, sha256: str | None = None,
+              timings: dict | None = None, refresh: str = "background") -> str:
+        """캐시에 있으면 바로 반환, 없으면 소스를 순서대로 시도해 받아서 반환.
+        refresh: revision을 모르는 소스의 캐시 처리 ("never" / "background" / "now")."""
+        timings = {} if timings is None else timings
+        if version is None and sha256: version = sha256.lower()[:16]
+        if version is not None:
+            dest = self.path_for(version)
+            t0 = time.perf_counter()
+            if self._cached(dest, sha256):
+                timings.update(source="cache", version=version, verify_s=time.perf_counter() - t0)
+                return dest
+        errors = []
+        for src in sources:
+            try:
+                if version is not None:
+                    self._download(src, dest, sha256, timings)
+                    timings["version"] = version
+                    return dest
+                rev = src.revision()
+                unpinned = rev is None  # 바뀌었는지 싸게 알 수 없는 소스
+                v = "unpinned-" + _short_hash(repr(src)) if unpinned else "rev-" + _short_hash(f"{src!r}:{rev}")
+                path = self.path_for(v)
+                t0 = time.perf_counter()
+                if not (unpinned and refresh == "now") and self._cached(path, None):
+                    timings.update(source="cache", version=v, verify_s=time.perf_counter() - t0)
+                    if unpinned and refresh == "background":  # 모델을 읽은 뒤 start_refresh()로 시작
+                        self.pending_refresh = (src, path)
+                        timings["refresh"] = "background"
+                    return path
+                self._download(src, path, None, timings)
+                timings["version"] = v
+                return path
+            except Exception as e:
+                errors.append(f"{src!r}: {type(e).__name__}: {e}")
+        raise RuntimeError("모델을 가져오지 못했습니다\n" + "\n".join(errors))
+
+# ======================
+# 부트스트랩 (다운로드 → 언피클 → 워밍업)
+# ======================
+def load_learner_timed(path: str, timings: dict):
+    from fastai.vision.all import load_learner
+    t0 = time.perf_counter()
+    learner = load_learner(path, cpu=True)
+    learner.model.eval()
+    timings["unpickle_s"] = time.perf_counter() - t0
+    return learner
+
+def warm_up(learner, timings: dict, forward=None, preprocess=None):
+    """더미 이미지로 forward 한 번 (첫 사용자 요청에서 발생하는 초기화 비용을 미리 지불)."""
+    from inference import batch_predict
+    size = preprocess.size if preprocess is not None else (224, 224)
+    t0 = time.perf_counter()
+    batch_predict(learner, [Image.new("RGB", size)], forward=forward, preprocess=preprocess)
+    timings["first_inference_s"] = time.perf_counter() - t0
+
+def bootstrap_model(sources: list, version: str | None = None, sha256: str | None = None,
+                    cache_dir: str = ".model_cache", refresh: str = "background"):
+    """(learner, 로컬 모델 경로, 단계별 소요시간) 반환. 워밍업은 백엔드 선택 후 warm_up으로 따로 호출.
+    version=None이면 ModelStore가 sha256 또는 소스 revision으로 정함."""
+    timings: dict = {}
+    t0 = time.perf_counter()
+    store = ModelStore(cache_dir)
+    path = store.fetch(sources, version, sha256, timings, refresh)
+    learner = load_learner_timed(path, timings)
+    store.start_refresh()
+    timings["total_s"] = time.perf_counter() - t0
+    return learner, path, timings
@@ -1,11 +1,17 @@
 # streamlit_py
-import os, re
-from io import BytesIO
-import numpy as np
+import hmac, os, re, time
+from io import StringIO
 import streamlit as st
-from PIL import Image, ImageOps
-from fastai.vision.all import *
-import gdown
+import streamlit.components.v1 as components
+from backends import BACKENDS, configure_threads, load_backend
+from bulk import Throughput, classify_stream, iter_uploads, to_parquet_bytes, write_csv
+from content_store import is_remote, load_content, read_local_image, resolve_labels
+from ingest import IngestError, Limits, MemoryBudget, ingest
+from media_cache import HttpFetcher, MediaProxy, ThumbnailCache
+from metrics import REGISTRY, enable_request_log, log_request, profile_request, start_metrics_server, timed
+from model_store import DriveSource, LocalSource, bootstrap_model, source_from_uri, warm_up
+from inference import (MicroBatcher, PredictionCache, TensorPreprocessor, batch_predict,
+                       image_key, model_fingerprint)
 
 # ======================
 # 페이지/스타일
@@ -37,124 +43,182 @@ st.title("이미지 분류기 (Fastai) — 확률 막대 + 라벨별 고정 콘
 # ======================
 # 세션 상태
 # ======================
-if "img_bytes" not in st.session_state:
-    st.session_state.img_bytes = None
+if "image" not in st.session_state:
+    st.session_state.image = None        # ingest.Ingested — 미리보기 + 모델 입력 + 해시만 보관 (원본 바이트는 버림)
+if "ingest_error" not in st.session_state:
+    st.session_state.ingest_error = None
 if "last_prediction" not in st.session_state:
     st.session_state.last_prediction = None
+if "bulk_rows" not in st.session_state:
+    st.session_state.bulk_rows = None
+if "pending" not in st.session_state:
+    st.session_state.pending = None      # (이미지 키, Future) — 진행 중인 예측
+if "inference_timings" not in st.session_state:
+    st.session_state.inference_timings = None  # (이미지 키, 배처 스레드에서 잰 queue_wait/preprocess/forward/…)
+if "request" not in st.session_state:
+    st.session_state.request = None      # 진행 중인 요청의 단계별 소요시간 (결과가 나오면 한 번 기록)
+if "last_result" not in st.session_state:
+    st.session_state.last_result = None  # (이미지 키, (pred, pred_idx, probs) 또는 오류 메시지, 저장 시각)
 
 # ======================
 # 모델 로드
 # ======================
 FILE_ID = st.secrets.get("GDRIVE_FILE_ID", "1cFVZwfNNpbp80YAXs_-SRxKhjSQjdBMf")
-MODEL_PATH = st.secrets.get("MODEL_PATH", "model.pkl")
+MODEL_PATH = st.secrets.get("MODEL_PATH", "model.pkl")       # 로컬 파일이 있으면 먼저 사용 (해시가 없으면 zip 무결성만 검사)
+MODEL_URL = st.secrets.get("MODEL_URL", "")                  # file:// 또는 http(s) 미러 (선택)
+MODEL_SHA256 = st.secrets.get("MODEL_SHA256", "") or None    # 지정하면 모든 소스를 이 해시로 검증 (권장)
+MODEL_VERSION = st.secrets.get("MODEL_VERSION", "") or None  # 비우면 해시 또는 소스의 크기·mtime/ETag로 자동 결정
+MODEL_CACHE_DIR = st.secrets.get("MODEL_CACHE_DIR", ".model_cache")
+# 해시 없는 Drive 사본: background = 캐시 사본을 쓰고 백그라운드로 확인 (바뀌면 다음 시작부터 적용) / never / now
+MODEL_REFRESH = st.secrets.get("MODEL_REFRESH", "background")
+
+INFERENCE_BACKEND = st.secrets.get("INFERENCE_BACKEND", "eager")  # eager / torchscript / onnx / quantized
+QUANT_MODE = st.secrets.get("QUANT_MODE", "dynamic")               # quantized일 때: dynamic / static
+TORCH_THREADS = int(st.secrets.get("TORCH_THREADS", 0))            # 0이면 torch 기본값
+TORCH_INTEROP_THREADS = int(st.secrets.get("TORCH_INTEROP_THREADS", 0))
+configure_threads(TORCH_THREADS, TORCH_INTEROP_THREADS)
+
+def model_sources() -> list:
+    """로컬 파일 → 미러 → Drive 순서 (가장 싼 것부터). 해시가 있으면 모두 검증, 없으면 잘린 파일만 걸러냄."""
+    srcs = [LocalSource(MODEL_PATH)] if os.path.exists(MODEL_PATH) else []
+    if MODEL_URL: srcs.append(source_from_uri(MODEL_URL))
+    if FILE_ID: srcs.append(DriveSource(FILE_ID))
+    return srcs
 
 @st.cache_resource
-def load_model_from_drive(file_id: str, output_path: str):
-    if not os.path.exists(output_path):
-        url = f"https://drive.google.com/uc?id={file_id}"
-        gdown.download(url, output_path, quiet=False)
-    return load_learner(output_path, cpu=True)
+def load_model(version: str | None, sha256: str | None, cache_dir: str, refresh: str):
+    """(learner, 캐시된 모델 경로, 시작 단계별 소요시간)."""
+    return bootstrap_model(model_sources(), version, sha256, cache_dir, refresh)
 
 with st.spinner("🤖 모델 로드 중..."):
-    learner = load_model_from_drive(FILE_ID, MODEL_PATH)
-st.success("✅ 모델 로드 완료")
+    learner, model_path, startup_timings = load_model(MODEL_VERSION, MODEL_SHA256, MODEL_CACHE_DIR, MODEL_REFRESH)
 
-labels = [str(x) for x in learner.dls.vocab]
-st.write(f"**분류 가능한 항목:** `{', '.join(labels)}`")
-st.markdown("---")
-
-# ======================
-# 라벨 이름 매핑: 여기를 채우세요!
-# 각 라벨당 최대 3개씩 표시됩니다.
 # ======================
-CONTENT_BY_LABEL: dict[str, dict[str, list[str]]] = {
-    # 예)
-    # "짬뽕": {
-    #   "texts": ["짬뽕의 특징과 유래", "국물 맛 포인트", "지역별 스타일 차이"],
-    #   "images": ["https://.../jjampong1.jpg", "https://.../jjampong2.jpg"],
-    #   "videos": ["https://youtu.be/XXXXXXXXXXX"]
-    # },
-     labels[0]: {
-       "texts": ["네이마르는", "세계 최고의", "드리블러"],
-       "images": ["https://i.namu.wiki/i/zu4_C_cWy9w94re4fXXqEVKfA0YmcwuNIUAbuf32WQJ3-BHc3XCnAhRuRqdBfDrIvkI_H2vMXxbmODpP2LX6LQ.webp"],
-       "videos": ["https://www.youtube.com/watch?v=rgz1Mo231TU"]
-     },
-      labels[1]: {
-       "texts": ["메시는", "세계 최고의", "축구선수"],
-       "images": ["https://encrypted-tbn0.gstatic.com/images?q=tbn:ANd9GcQBs6nuf-DmxKNAie-5GWHNmYs44747-0BtbwhaV-8krnz88HxVMbpbky06kQNP7TFG5e0ba1e1httBLohXRYw_Ts-0DiqSCjBRxlI_c1Qq&s=10"],
-       "videos": ["https://www.youtube.com/watch?v=3NeDP4C_oRM"]
-      },
-      labels[2]: {
-       "texts": ["호날두는", "세계 최고의", "스트라이커"],
-       "images": ["data:image/webp;base64,UklGRvYLAABXRUJQVlA4IOoLAAAwOwCdASqgAHcAPsUssVinoaenmGDwGIlH4sP11ScoIzHUMvwWvcN3cXKs/0jrr88oU/yngd2We0eYrCw5bS4/xA/eEz88lLqAI7iJqKiqtIBAbhY7nMYknW/IPSfRZjkiznLEotvBe6iogdPJi3X3XRNM1UweGpcIp/PHyzfyBH5l/lerFoG9MTW5BR3alsqIksA9gACYfgh0YHFi/13RUyBhbVmezDIIgilVcdvJMoN8ivfySJ8YUxTPNkmhyoycw3thVs04y3MuHigyz8AgVqe0q0q+wEvU4qbAsiLqSS29kh2DRkr4CQT0ylv+9vJausarLRulXtm8FdpQSwlE/JRmHrOuQgtmVkbGSAcpHiym3V3wuRoMb1XCPdLFmwbOeam+sWyVMbhM1wzvnLZODJNlByMnHTIyGepYrjhITIwSE5q2K9KT1Wzfaw/mAqWG5BijclUdvxeDDloi1wYxQNBWFD8OssO0xIabBJbwySBIQgjFd0s+g8RNnqAIozttnCGembtmqH8nfNRd7N8PaIacJNveIIidvCJAx2tvsLEjQrfZ6x0X5I9PHpaY9qWHKlOiJWf9Q0aLperKFMTuMOTJYv2n158qcZ4e6bjZ4YGj89ZlVlowFgcBWgtYLTKAgAD+/oi6RxRL3G5js2gibsI1Vku7WMjbMK80SAu8jC+TZ/4hAm5HP5OcbYbJYn5OiafBPFxgC32htJMrciZFoOH6M4xCnauFy56HwNdSWx8Q54FYzqUjRRa3H5ipgKksWuHq1GVppFZTVYR7n/3nKt/gQUNIxDFxpM/PMot2OO//nu7Vt5dgl7ziGDXCyVA3D9sj2dS4VvTDt8qYJ54mF/QmTSNce+aen1ai8DmN1Wjvdn5j2cMBiCcc4+uxhxbXvN6Ba+KzECzpqnjHwh7PS+5MtjpG8ioRMq3XKQnnLgJtPlvU5hpk9r69ABYClnxrKaF4iS7e4pDjWiCuj0yBMviMao13kXOMJWQsxeK/LDLpxkayr4H3RUYb3xe0V/cP6uw/XmJ+/DA+b7QBXA3mbUFyLmM+OuSFUdsxJubdTzg/eipVkZ7fzNXyU7JHZRsXBF+gD+A5IXqnRh5hbDh4GWt9plfH9CKq3WGuTy5JDdmrZqjnah7hQRXLoIc5Xcpyx0gBJqGg0ZJk8u+wOklqLvVjjT0P5U2xbtmtjoujfLKRbAxerECnZmZYUoPDyf/uUsg+w1D8855oJss7xzrJk/am8dunmqXcFCBQ7qwLWiWPlxYGNIeMuqdqYH6xnFQBra/55BTsijh46cPEDi56hmLcuhaKB/Kz99nqbeIyCAJYtjJBxEUMbHuB1VAi3DTae+eoOlkP21KRn0h+0nf4W5Qr+JqJ6zHPbiYZW/ZYgzppf4EXpYRBHbOdPKDaLb+fTDlihUem2qghuoeSBIIwnk6U/Rk5sYJIVwih57Fli2+ytDdnEiRkGRiFOZCO6dR/rdHKyOFLqfWmM+DOtGpaluRRra9rLqC/COQHwt7Eatq6ItmIZGgGFR6sbPqB9COwTp6spc/3exhhqxZ5BKXJenPIO75Qpwbv43RO9X71Zj43xRjFygw39u91xdVkrcWM1G/zoKZTWHVWmI7wGMZcwEnq7Mxbg5jf6v+InTyCufUVCABG61cmOaeSq9+Uu7Ol4P9PM6Hoec5Hlj3TRx/MyQoPX17TjbqETtJyS67tQUWvClqLO8MoDyNNMNhwRjS1dhadj7bIqXlONFwNoFPzX12sYvei/PEsCvjONOX/0TZcQYhS1tJnloEOGeWFj7q5eNRjCboTYmNRu3XJNthbKe01iihKvSAjxXX/3mJamoWnX6fj4HHK002PKKzTEmWIoi3s67q7MoDLHabVt8v/uOwjaGH5GAXeb2S+Oth+QIYYWNx25x/Z3Tvm9PpUdkgFZlv+ydhR6BeRNLVZOCrrt07Ongl6Q9txeRbgmrZ+eoJfHoWK9KljfKAFA10uJaCMrOdLVEAuhHvY71dK3x1ghe97heplf/NpfcnO7n8GNpsiRMgC8MO0CfExhwFrslWPw2baROmUdK0x6naY650Rx9hUN+XED27Hah5yCDkk8QptoPfZDtZOj5ctFECRYQ55GJbVibRqPzdRmCp1SFnRin6pt27PfhhMhTS4V0HnpYw/Kh55VqKPIzI5RlJeYA/AVHiIsoTBy1SKJmRCAXVZgZxLgLNh9BOgRPZFyFIEZa10L/7QGgjUPvG7zz8B6/kc9RTuPyNOOUg44zX8eS85GW2R8mb32vsDhBhMLRgCtAI1JQ/j6yzvNVxE/2EFpRDjf0uFj8IH8Ir2204YWk2G6caQToiphB+b8EkrfKUFKfgneaiUhj0iZ3rQZaFFbCwELK4PlRgxWzQyuJLAsWjw8bNK1MdtuRxWm4e09b2Vd5b0LoSDLgSwnsqEbX8fhLqlF2/nJYS32Tb/5p/g7oTVU1TsKNzjn0jWxukwCZ4d9i1OrbecvY5sWR/k0KM1uxx6+la9tn4pkmm8xE+7wxmj6Eist3GwhnU+nT/fExAjoUvrv32h8ORbOFoZYqWQfFcdfu0975u9vSBqSAZdUD76VafdORcCCJumQXq1qeWT2xTF8hIoffncpDT9/hcEIWnq7zXRr/WUDyUOa7EJa/UjQqEGaiHBJG1CKcqYdYTyjcfvlvSO+Pd+b+/HCb9oDtq/sWhN0jiMKd0wlPG1Q+cOOvpl/0Mcch3nI5npVhuq4xS944yuwmghEkPVSCk+rGy00f9jiXQ+O7lh3EXmkZ35tV5ZympyGbIq1p2nsK/afyE5N2BKlyOZEnixn4G9z0HzWYfbB1NPaIEbxzv0kiC3XqBSkrZ0dAtf7MB4H794tPzMM6SKMc3Gp6fzpm4WxAVhrXFZb39Y+qO4QdOrYzwfkJQI/zVxAcUwLrQ8K6AMZ+r7sozZMoOqTpam9HlBhs36syflYVBikcbekJkN8pb3FRcXS4WXokWcwfRUDio6nMqgLCYQHVdvJeXvFFMUMLavPb6lFsTzi50Tba3Z4ID6fO1hKnUd0bDqgrw6wnY0Nv0Tka6758f0PurA0pi8W3Fz3CFvQd6EBOadjJ1Rgh5mhRF9sPduRBOwQZ0nz36LTw1BUIdC9+I0H7G+AoNWsvOSo/pxGGDyzz4ECnQt3flz1wiMwVDV20KI4jFx/VkkFw6hnAdQgqhb4OhLNjyepe3LpgO8LtHrSMwD9UtvK7ZoPsj17XqAclFZ/wPGV70ehmoRueZBO/EKmcjyZI9H03y4Vdb1p23ev07eqp2XaScXe/X2Whq6CsxmWA1vUPlyF7Ol0eT7jfhcBBx6uQ1L4bOdh467vK/AaCw7P89lubndAJPEHJDwgpSKhqIzMaNMEYDCz0SrLPmy+aeDJ1uoYKgIlhtGDNSM3kGwcJm2ASBWlWJ6ReIhbJ2o/DUylcROgOfZVWz0KFqS9QYAlbHotnslfbOg9fy0iBElVoCcKzwrY9K7an2K8flVuKxbGaQDjEjXybObERVxHbly81AAIXdMLJP++xwLrJLtkYz60/dFibFtlpnXhj1wq5x36nhnfOtTU/P90bO0lO/sNq7bj+tNv+zlSBxAX2VEt1F2aeeWGGQxBVC2KPhMgwp8JnFOYHFlLvZghh7v+2JaPkhIaUEbMEeqS/KBs5VfE4uoC6Sy5BzcPssR3s6/1q0m5QraMsgLp71Nm7ybNTCX6HOPttOk9JmcCMBueOgLCe/AcSHMwYhSzE1OsayJxXi+YjLnIDdRL9GPCzmd324CgO6zfPpXLvWlHiSUVTxPN8NOOtIEfysLEAZeu5w0mgsA25oWk3nNcmn1EXOExbQ0PNUKHjAA+0TlRJoa+M5gs7IHVgHkEsKz1KUYRMFFEkctl4rDWdHYCRIDJ1QAOqYgzR2iioriDk+DS1ZmVTK/clgRZ2S5j3s4CctJqvwi0mLTr1QKkYrhJqu8/E/ya9jovCkaf1wza2/npvKyGBMApurHy8hq+HI768/K54dh2AQk6gZoYe5aJrbABwB4jZD+Lu5Dhy9gL1YJFcJyeuNPYmwqW9Lgwquolx8kNqOAAA=="],
-       "videos": ["https://www.youtube.com/watch?v=qmWz-RoZNSU"]
-      },
-}
-# 세션 상태
+# 예측 캐시 (모든 세션 공유, 같은 이미지+모델이면 추론 생략)
 # ======================
-if "img_bytes" not in st.session_state:
-    st.session_state.img_bytes = None
-if "last_prediction" not in st.session_state:
-    st.session_state.last_prediction = None
+PRED_CACHE_SIZE = int(st.secrets.get("PRED_CACHE_SIZE", 256))
+PRED_CACHE_TTL = float(st.secrets.get("PRED_CACHE_TTL", 3600))
+
+@st.cache_resource
+def get_prediction_cache(maxsize: int, ttl: float) -> PredictionCache:
+    cache = PredictionCache(maxsize=maxsize, ttl=ttl)
+    REGISTRY.register_collector("prediction_cache", cache.stats)
+    return cache
+
+pred_cache = get_prediction_cache(PRED_CACHE_SIZE, PRED_CACHE_TTL)
+MODEL_ID = model_fingerprint(model_path)
 
 # ======================
-# 모델 로드
+# 직접 전처리 + 마이크로 배칭 추론 (여러 세션의 요청을 한 번의 forward로)
 # ======================
-FILE_ID = st.secrets.get("GDRIVE_FILE_ID", "1cFVZwfNNpbp80YAXs_-SRxKhjSQjdBMf")
-MODEL_PATH = st.secrets.get("MODEL_PATH", "model.pkl")
+BATCH_MAX_SIZE = int(st.secrets.get("BATCH_MAX_SIZE", 8))
+BATCH_MAX_WAIT_MS = float(st.secrets.get("BATCH_MAX_WAIT_MS", 10))
+PREDICTION_POLL_SEC = float(st.secrets.get("PREDICTION_POLL_SEC", 0.3))
+PREDICTION_ERROR_TTL = float(st.secrets.get("PREDICTION_ERROR_TTL", 30))  # 실패한 예측은 이 시간 뒤 다시 시도
 
 @st.cache_resource
-def load_model_from_drive(file_id: str, output_path: str):
-    if not os.path.exists(output_path):
-        url = f"https://drive.google.com/uc?id={file_id}"
-        gdown.download(url, output_path, quiet=False)
-    return load_learner(output_path, cpu=True)
+def get_preprocessor(_learner, model_id: str) -> TensorPreprocessor | None:
+    return TensorPreprocessor.from_learner(_learner)
 
-with st.spinner("🤖 모델 로드 중..."):
-    learner = load_model_from_drive(FILE_ID, MODEL_PATH)
+@st.cache_resource
+def get_forward(_learner, model_id: str, backend: str, quant_mode: str):
+    """선택한 백엔드의 forward 함수. 준비에 실패하면 eager로 대체하고 오류 메시지를 함께 반환."""
+    try:
+        return load_backend(_learner, backend, model_path, quant_mode,
+                            intra=TORCH_THREADS, inter=TORCH_INTEROP_THREADS), backend, None
+    except Exception as e:
+        return _learner.model.eval(), "eager", f"{type(e).__name__}: {e}"
+
+@st.cache_resource
+def get_batcher(_learner, model_id: str, backend: str, quant_mode: str, max_batch: int,
+                max_wait_ms: float) -> MicroBatcher:
+    _learner.model.eval()
+    prep = get_preprocessor(_learner, model_id)
+    fwd, _, _ = get_forward(_learner, model_id, backend, quant_mode)
+    b = MicroBatcher(lambda items, t: batch_predict(_learner, items, forward=fwd, preprocess=prep, timings=t),
+                     max_batch, max_wait_ms)
+    REGISTRY.register_collector("batcher", b.stats)
+    return b
+
+FAST_DECODE = bool(st.secrets.get("FAST_DECODE", False))  # JPEG draft 디코딩 (learner.predict와 픽셀 단위로 동일하지 않음)
+preprocessor = get_preprocessor(learner, MODEL_ID)
+if INFERENCE_BACKEND not in BACKENDS:
+    st.warning(f"알 수 없는 INFERENCE_BACKEND `{INFERENCE_BACKEND}` → eager 사용")
+    INFERENCE_BACKEND = "eager"
+_, backend_used, backend_err = get_forward(learner, MODEL_ID, INFERENCE_BACKEND, QUANT_MODE)
+if backend_err:
+    st.warning(f"`{INFERENCE_BACKEND}` 백엔드 준비 실패 → eager 사용 ({backend_err})")
+batcher = get_batcher(learner, MODEL_ID, INFERENCE_BACKEND, QUANT_MODE, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS)
+# 예측 캐시 키용 식별자: 모델 + 실제 사용 중인 백엔드/양자화 방식 + 디코딩 방식 (설정이 바뀌면 이전 결과를 쓰지 않음)
+PREDICTION_ID = f"{MODEL_ID}|{backend_used}|{QUANT_MODE if backend_used == 'quantized' else '-'}|fast_decode={FAST_DECODE}"
+
+@st.cache_resource
+def warm_up_model(_learner, model_id: str, backend: str, quant_mode: str) -> dict:
+    """더미 forward 한 번 (프로세스당 1회). 끝나야 '로드 완료'를 표시."""
+    fwd, _, _ = get_forward(_learner, model_id, backend, quant_mode)
+    warm_up(_learner, startup_timings, fwd, get_preprocessor(_learner, model_id))
+    for k, v in startup_timings.items():
+        if isinstance(v, float): REGISTRY.set_gauge(f"startup_{k}", v)
+    return startup_timings
+
+with st.spinner("🔥 모델 워밍업 중..."):
+    warm_up_model(learner, MODEL_ID, INFERENCE_BACKEND, QUANT_MODE)
 st.success("✅ 모델 로드 완료")
 
+with st.sidebar.expander("⚙️ 추론 통계"):
+    st.json({"prediction_cache": pred_cache.stats(), "batcher": batcher.stats(),
+             "backend": backend_used,
+             "startup": startup_timings, "direct_preprocess": preprocessor is not None, "fast_decode": FAST_DECODE})
+
 labels = [str(x) for x in learner.dls.vocab]
 st.write(f"**분류 가능한 항목:** `{', '.join(labels)}`")
 st.markdown("---")
 
 # ======================
-# 라벨 이름 매핑: 여기를 채우세요!
-# 각 라벨당 최대 3개씩 표시됩니다.
+# 라벨별 콘텐츠: content.json (또는 SQLite)에서 읽음. 각 라벨당 최대 3개씩 표시됩니다.
 # ======================
-CONTENT_BY_LABEL: dict[str, dict[str, list[str]]] = {
-    # 예)
-    # "짬뽕": {
-    #   "texts": ["짬뽕의 특징과 유래", "국물 맛 포인트", "지역별 스타일 차이"],
-    #   "images": ["https://.../jjampong1.jpg", "https://.../jjampong2.jpg"],
-    #   "videos": ["https://youtu.be/XXXXXXXXXXX"]
-    # },
-     labels[0]: {
-       "texts": ["네이마르는 세계 최고의 드리블러"],
-       "images": ["https://i.namu.wiki/i/zu4_C_cWy9w94re4fXXqEVKfA0YmcwuNIUAbuf32WQJ3-BHc3XCnAhRuRqdBfDrIvkI_H2vMXxbmODpP2LX6LQ.webp"],
-       "videos": ["https://www.youtube.com/watch?v=rgz1Mo231TU"]
-     },
-     labels[1]: {
-       "texts": ["메시는 세계 최고의 축구선수"],
-       "images": ["https://encrypted-tbn0.gstatic.com/images?q=tbn:ANd9GcQBs6nuf-DmxKNAie-5GWHNmYs44747-0BtbwhaV-8krnz88HxVMbpbky06kQNP7TFG5e0ba1e1httBLohXRYw_Ts-0DiqSCjBRxlI_c1Qq&s=10"],
-       "videos": ["https://www.youtube.com/watch?v=3NeDP4C_oRM"]
-     },
-      labels[2]: {
-       "texts": ["호날두는", "세계 최고의", "스트라이커"],
-       "images": ["data:image/webp;base64,UklGRvYLAABXRUJQVlA4IOoLAAAwOwCdASqgAHcAPsUssVinoaenmGDwGIlH4sP11ScoIzHUMvwWvcN3cXKs/0jrr88oU/yngd2We0eYrCw5bS4/xA/eEz88lLqAI7iJqKiqtIBAbhY7nMYknW/IPSfRZjkiznLEotvBe6iogdPJi3X3XRNM1UweGpcIp/PHyzfyBH5l/lerFoG9MTW5BR3alsqIksA9gACYfgh0YHFi/13RUyBhbVmezDIIgilVcdvJMoN8ivfySJ8YUxTPNkmhyoycw3thVs04y3MuHigyz8AgVqe0q0q+wEvU4qbAsiLqSS29kh2DRkr4CQT0ylv+9vJausarLRulXtm8FdpQSwlE/JRmHrOuQgtmVkbGSAcpHiym3V3wuRoMb1XCPdLFmwbOeam+sWyVMbhM1wzvnLZODJNlByMnHTIyGepYrjhITIwSE5q2K9KT1Wzfaw/mAqWG5BijclUdvxeDDloi1wYxQNBWFD8OssO0xIabBJbwySBIQgjFd0s+g8RNnqAIozttnCGembtmqH8nfNRd7N8PaIacJNveIIidvCJAx2tvsLEjQrfZ6x0X5I9PHpaY9qWHKlOiJWf9Q0aLperKFMTuMOTJYv2n158qcZ4e6bjZ4YGj89ZlVlowFgcBWgtYLTKAgAD+/oi6RxRL3G5js2gibsI1Vku7WMjbMK80SAu8jC+TZ/4hAm5HP5OcbYbJYn5OiafBPFxgC32htJMrciZFoOH6M4xCnauFy56HwNdSWx8Q54FYzqUjRRa3H5ipgKksWuHq1GVppFZTVYR7n/3nKt/gQUNIxDFxpM/PMot2OO//nu7Vt5dgl7ziGDXCyVA3D9sj2dS4VvTDt8qYJ54mF/QmTSNce+aen1ai8DmN1Wjvdn5j2cMBiCcc4+uxhxbXvN6Ba+KzECzpqnjHwh7PS+5MtjpG8ioRMq3XKQnnLgJtPlvU5hpk9r69ABYClnxrKaF4iS7e4pDjWiCuj0yBMviMao13kXOMJWQsxeK/LDLpxkayr4H3RUYb3xe0V/cP6uw/XmJ+/DA+b7QBXA3mbUFyLmM+OuSFUdsxJubdTzg/eipVkZ7fzNXyU7JHZRsXBF+gD+A5IXqnRh5hbDh4GWt9plfH9CKq3WGuTy5JDdmrZqjnah7hQRXLoIc5Xcpyx0gBJqGg0ZJk8u+wOklqLvVjjT0P5U2xbtmtjoujfLKRbAxerECnZmZYUoPDyf/uUsg+w1D8855oJss7xzrJk/am8dunmqXcFCBQ7qwLWiWPlxYGNIeMuqdqYH6xnFQBra/55BTsijh46cPEDi56hmLcuhaKB/Kz99nqbeIyCAJYtjJBxEUMbHuB1VAi3DTae+eoOlkP21KRn0h+0nf4W5Qr+JqJ6zHPbiYZW/ZYgzppf4EXpYRBHbOdPKDaLb+fTDlihUem2qghuoeSBIIwnk6U/Rk5sYJIVwih57Fli2+ytDdnEiRkGRiFOZCO6dR/rdHKyOFLqfWmM+DOtGpaluRRra9rLqC/COQHwt7Eatq6ItmIZGgGFR6sbPqB9COwTp6spc/3exhhqxZ5BKXJenPIO75Qpwbv43RO9X71Zj43xRjFygw39u91xdVkrcWM1G/zoKZTWHVWmI7wGMZcwEnq7Mxbg5jf6v+InTyCufUVCABG61cmOaeSq9+Uu7Ol4P9PM6Hoec5Hlj3TRx/MyQoPX17TjbqETtJyS67tQUWvClqLO8MoDyNNMNhwRjS1dhadj7bIqXlONFwNoFPzX12sYvei/PEsCvjONOX/0TZcQYhS1tJnloEOGeWFj7q5eNRjCboTYmNRu3XJNthbKe01iihKvSAjxXX/3mJamoWnX6fj4HHK002PKKzTEmWIoi3s67q7MoDLHabVt8v/uOwjaGH5GAXeb2S+Oth+QIYYWNx25x/Z3Tvm9PpUdkgFZlv+ydhR6BeRNLVZOCrrt07Ongl6Q9txeRbgmrZ+eoJfHoWK9KljfKAFA10uJaCMrOdLVEAuhHvY71dK3x1ghe97heplf/NpfcnO7n8GNpsiRMgC8MO0CfExhwFrslWPw2baROmUdK0x6naY650Rx9hUN+XED27Hah5yCDkk8QptoPfZDtZOj5ctFECRYQ55GJbVibRqPzdRmCp1SFnRin6pt27PfhhMhTS4V0HnpYw/Kh55VqKPIzI5RlJeYA/AVHiIsoTBy1SKJmRCAXVZgZxLgLNh9BOgRPZFyFIEZa10L/7QGgjUPvG7zz8B6/kc9RTuPyNOOUg44zX8eS85GW2R8mb32vsDhBhMLRgCtAI1JQ/j6yzvNVxE/2EFpRDjf0uFj8IH8Ir2204YWk2G6caQToiphB+b8EkrfKUFKfgneaiUhj0iZ3rQZaFFbCwELK4PlRgxWzQyuJLAsWjw8bNK1MdtuRxWm4e09b2Vd5b0LoSDLgSwnsqEbX8fhLqlF2/nJYS32Tb/5p/g7oTVU1TsKNzjn0jWxukwCZ4d9i1OrbecvY5sWR/k0KM1uxx6+la9tn4pkmm8xE+7wxmj6Eist3GwhnU+nT/fExAjoUvrv32h8ORbOFoZYqWQfFcdfu0975u9vSBqSAZdUD76VafdORcCCJumQXq1qeWT2xTF8hIoffncpDT9/hcEIWnq7zXRr/WUDyUOa7EJa/UjQqEGaiHBJG1CKcqYdYTyjcfvlvSO+Pd+b+/HCb9oDtq/sWhN0jiMKd0wlPG1Q+cOOvpl/0Mcch3nI5npVhuq4xS944yuwmghEkPVSCk+rGy00f9jiXQ+O7lh3EXmkZ35tV5ZympyGbIq1p2nsK/afyE5N2BKlyOZEnixn4G9z0HzWYfbB1NPaIEbxzv0kiC3XqBSkrZ0dAtf7MB4H794tPzMM6SKMc3Gp6fzpm4WxAVhrXFZb39Y+qO4QdOrYzwfkJQI/zVxAcUwLrQ8K6AMZ+r7sozZMoOqTpam9HlBhs36syflYVBikcbekJkN8pb3FRcXS4WXokWcwfRUDio6nMqgLCYQHVdvJeXvFFMUMLavPb6lFsTzi50Tba3Z4ID6fO1hKnUd0bDqgrw6wnY0Nv0Tka6758f0PurA0pi8W3Fz3CFvQd6EBOadjJ1Rgh5mhRF9sPduRBOwQZ0nz36LTw1BUIdC9+I0H7G+AoNWsvOSo/pxGGDyzz4ECnQt3flz1wiMwVDV20KI4jFx/VkkFw6hnAdQgqhb4OhLNjyepe3LpgO8LtHrSMwD9UtvK7ZoPsj17XqAclFZ/wPGV70ehmoRueZBO/EKmcjyZI9H03y4Vdb1p23ev07eqp2XaScXe/X2Whq6CsxmWA1vUPlyF7Ol0eT7jfhcBBx6uQ1L4bOdh467vK/AaCw7P89lubndAJPEHJDwgpSKhqIzMaNMEYDCz0SrLPmy+aeDJ1uoYKgIlhtGDNSM3kGwcJm2ASBWlWJ6ReIhbJ2o/DUylcROgOfZVWz0KFqS9QYAlbHotnslfbOg9fy0iBElVoCcKzwrY9K7an2K8flVuKxbGaQDjEjXybObERVxHbly81AAIXdMLJP++xwLrJLtkYz60/dFibFtlpnXhj1wq5x36nhnfOtTU/P90bO0lO/sNq7bj+tNv+zlSBxAX2VEt1F2aeeWGGQxBVC2KPhMgwp8JnFOYHFlLvZghh7v+2JaPkhIaUEbMEeqS/KBs5VfE4uoC6Sy5BzcPssR3s6/1q0m5QraMsgLp71Nm7ybNTCX6HOPttOk9JmcCMBueOgLCe/AcSHMwYhSzE1OsayJxXi+YjLnIDdRL9GPCzmd324CgO6zfPpXLvWlHiSUVTxPN8NOOtIEfysLEAZeu5w0mgsA25oWk3nNcmn1EXOExbQ0PNUKHjAA+0TlRJoa+M5gs7IHVgHkEsKz1KUYRMFFEkctl4rDWdHYCRIDJ1QAOqYgzR2iioriDk+DS1ZmVTK/clgRZ2S5j3s4CctJqvwi0mLTr1QKkYrhJqu8/E/ya9jovCkaf1wza2/npvKyGBMApurHy8hq+HI768/K54dh2AQk6gZoYe5aJrbABwB4jZD+Lu5Dhy9gL1YJFcJyeuNPYmwqW9Lgwquolx8kNqOAAA=="],
-       "videos": ["https://www.youtube.com/watch?v=qmWz-RoZNSU"]
-      },
-}
+CONTENT_PATH = st.secrets.get("CONTENT_PATH", "content.json")
+MEDIA_CACHE_MAX_MB = int(st.secrets.get("MEDIA_CACHE_MAX_MB", 200))
+MEDIA_FETCH_WORKERS = int(st.secrets.get("MEDIA_FETCH_WORKERS", 4))
+
+@st.cache_resource
+def get_thumb_cache() -> ThumbnailCache:
+    return ThumbnailCache(max_bytes=MEDIA_CACHE_MAX_MB << 20)
+
+@st.cache_resource
+def get_media_proxy() -> MediaProxy:
+    """원격 이미지(나무위키, gstatic, 유튜브 썸네일)를 서버에서 한 번 받아 카드 크기 썸네일로 제공."""
+    proxy = MediaProxy(get_thumb_cache(), HttpFetcher(pool_size=MEDIA_FETCH_WORKERS), workers=MEDIA_FETCH_WORKERS)
+    REGISTRY.register_collector("media", proxy.stats)
+    return proxy
+
+def local_thumb_url(ref: str, base_dir: str) -> str | None:
+    try:
+        return get_thumb_cache().put(read_local_image(ref, base_dir))
+    except Exception:
+        return None
+
+@st.cache_data
+def load_label_content(path: str, mtime: float, labels: tuple[str, ...]) -> dict:
+    """파일 mtime이 바뀌면 다시 읽음. 로컬/data URI 이미지는 썸네일 캐시 URL로 치환 (HTML에 인라인하지 않음)."""
+    content = resolve_labels(load_content(path), labels)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    for cfg in content.values():
+        cfg["images"] = [u if is_remote(u) else local_thumb_url(u, base_dir) for u in cfg["images"]]
+    return content
+
+@st.cache_resource
+def prefetch_label_media(path: str, mtime: float, labels: tuple[str, ...]) -> int:
+    """시작 시 (그리고 콘텐츠 파일이 바뀔 때) 모든 라벨의 원격 이미지·유튜브 썸네일을 백그라운드로 받아 둠."""
+    urls = []
+    for cfg in load_label_content(path, mtime, labels).values():
+        urls += [u for u in cfg["images"] if u and is_remote(u)]
+        urls += [yt_thumb(v) for v in cfg["videos"]]
+    return len(get_media_proxy().prefetch(urls))
 
 # ======================
 # 유틸
 # ======================
-def load_pil_from_bytes(b: bytes) -> Image.Image:
-    pil = Image.open(BytesIO(b))
-    pil = ImageOps.exif_transpose(pil)
-    if pil.mode != "RGB": pil = pil.convert("RGB")
-    return pil
-
 def yt_id_from_url(url: str) -> str | None:
     if not url: return None
     pats = [r"(?:v=|/)([0-9A-Za-z_-]{11})(?:\?|&|/|$)", r"youtu\.be/([0-9A-Za-z_-]{11})"]
@@ -170,19 +234,160 @@ def yt_thumb(url: str) -> str | None:
 def pick_top3(lst):
     return [x for x in lst if isinstance(x, str) and x.strip()][:3]
 
+def media_url(url: str) -> str:
+    """원격 이미지는 로컬 썸네일 URL로 (아직 없으면 원본 URL, 백그라운드에서 받는 중)."""
+    return get_media_proxy().url_for(url) if is_remote(url) else url
+
 def get_content_for_label(label: str):
     """라벨명으로 콘텐츠 반환 (texts, images, videos). 없으면 빈 리스트."""
-    cfg = CONTENT_BY_LABEL.get(label, {})
+    cfg = {}
+    if os.path.exists(CONTENT_PATH):
+        args = (CONTENT_PATH, os.path.getmtime(CONTENT_PATH), tuple(labels))
+        cfg = load_label_content(*args).get(label, {})
+        if not all(get_thumb_cache().exists(u) for u in cfg.get("images", []) if u):
+            load_label_content.clear()  # 썸네일 파일이 지워졌으면 다시 만듦
+            cfg = load_label_content(*args).get(label, {})
     return (
         pick_top3(cfg.get("texts", [])),
         pick_top3(cfg.get("images", [])),
         pick_top3(cfg.get("videos", [])),
     )
 
+if os.path.exists(CONTENT_PATH):
+    prefetch_label_media(CONTENT_PATH, os.path.getmtime(CONTENT_PATH), tuple(labels))
+with st.sidebar.expander("🖼️ 미디어 캐시"):
+    st.json(get_media_proxy().stats())
+
+# ======================
+# 계측: /metrics 엔드포인트(선택), 관리자 화면(?admin=1), 요청 단위 프로파일링(?profile=1)
+# ======================
+METRICS_PORT = int(st.secrets.get("METRICS_PORT", 0))            # 0이면 끔. 켜면 :PORT/metrics, /metrics.json
+ADMIN_TOKEN = st.secrets.get("ADMIN_TOKEN", "")                   # 지정해야 관리자 화면 사용 가능: ?admin=1&token=...
+ALLOW_PROFILING = bool(st.secrets.get("ALLOW_PROFILING", False))  # ?profile=1 허용 여부
+LOG_REQUESTS = bool(st.secrets.get("LOG_REQUESTS", True))         # 요청당 JSON 로그 한 줄
+
+@st.cache_resource
+def get_metrics_server(port: int):
+    return start_metrics_server(port) if port else None
+
+get_metrics_server(METRICS_PORT)
+if LOG_REQUESTS: enable_request_log()
+
+def admin_allowed() -> bool:
+    qp = st.query_params
+    return (bool(ADMIN_TOKEN) and qp.get("admin") == "1"
+            and hmac.compare_digest(qp.get("token", ""), ADMIN_TOKEN))
+
+def show_admin_page():
+    st.header("📊 계측")
+    snap = REGISTRY.snapshot()
+    st.subheader("단계별 지연시간 · 입력 크기")
+    st.dataframe([{"metric": k, **v} for k, v in sorted(snap["histograms"].items())], use_container_width=True)
+    c1, c2 = st.columns(2)
+    with c1:
+        st.subheader("카운터")
+        st.json(snap["counters"])
+    with c2:
+        st.subheader("게이지")
+        st.json(snap["gauges"])
+    text = REGISTRY.prometheus_text()
+    st.download_button("Prometheus 텍스트 다운로드", text, "metrics.txt", "text/plain")
+    with st.expander("Prometheus 텍스트"):
+        st.code(text)
+
+if admin_allowed():
+    show_admin_page()
+    st.stop()
+
+PROFILE_REQUEST = ALLOW_PROFILING and st.query_params.get("profile") == "1"
+
+def show_profile(out: dict):
+    with st.expander("🔬 이 요청의 프로파일", expanded=True):
+        if "html" in out:
+            components.html(out["html"], height=600, scrolling=True)
+            st.download_button("프로파일 HTML 다운로드", out["html"], "profile.html", "text/html")
+        else:
+            st.code(out.get("text", ""))
+
+# ======================
+# 일괄 분류 (여러 파일 / ZIP)
+# ======================
+BULK_BATCH_SIZE = int(st.secrets.get("BULK_BATCH_SIZE", 32))
+BULK_WORKERS = int(st.secrets.get("BULK_WORKERS", 4))
+BULK_PREVIEW_ROWS = int(st.secrets.get("BULK_PREVIEW_ROWS", 200))
+
+def run_bulk(files, top_k: int):
+    """결과를 배치 단위로 표에 갱신하고, 끝나면 미리보기 행과 CSV/Parquet 바이트를 session_state.bulk_rows에 저장."""
+    entries = list(iter_uploads(files, INGEST_LIMITS.max_bytes))  # (이름, 읽기 함수)만 모음 — 이미지 자체는 스트리밍으로 디코딩
+    fwd, _, _ = get_forward(learner, MODEL_ID, INFERENCE_BACKEND, QUANT_MODE)
+    bar, status, table = st.progress(0.0), st.empty(), st.empty()
+    rows, tp = [], Throughput()
+    # 항목마다 단일 이미지와 같은 크기·해상도 상한과 프로세스 공용 메모리 예산을 적용
+    for row in classify_stream(learner, entries, fwd, preprocessor, BULK_BATCH_SIZE, BULK_WORKERS, top_k,
+                               FAST_DECODE, INGEST_LIMITS, memory_budget):
+        rows.append(row)
+        tp.add()
+        if tp.n % BULK_BATCH_SIZE == 0 or tp.n == len(entries):
+            bar.progress(tp.n / max(1, len(entries)))
+            status.text(f"{tp.n} / {len(entries)}장 처리 · {tp.rate:.1f} images/sec")
+            table.dataframe(rows[-BULK_PREVIEW_ROWS:], use_container_width=True)
+    table.empty()
+    # 내보내기 파일은 여기서 한 번만 만들고 저장 (이후 다시 그릴 때마다 만들지 않음)
+    buf = StringIO()
+    write_csv(rows, buf, top_k)
+    try:
+        parquet = to_parquet_bytes(rows, top_k)
+    except ImportError:
+        parquet = None
+    st.session_state.bulk_rows = {"preview": rows[:BULK_PREVIEW_ROWS], "n": len(rows),
+                                  "errors": sum(1 for r in rows if r["error"]),
+                                  "csv": buf.getvalue().encode("utf-8-sig"), "parquet": parquet}
+
+def show_bulk_results():
+    res = st.session_state.bulk_rows
+    st.caption(f"{res['n']}장 중 오류 {res['errors']}장 · 표에는 처음 {len(res['preview'])}행만 표시 (전체는 다운로드)")
+    st.dataframe(res["preview"], use_container_width=True)
+    c1, c2 = st.columns(2)
+    c1.download_button("CSV 다운로드", res["csv"], "results.csv", "text/csv")
+    if res["parquet"] is not None:
+        c2.download_button("Parquet 다운로드", res["parquet"], "results.parquet", "application/octet-stream")
+    else:
+        c2.caption("Parquet 저장에는 pyarrow가 필요합니다.")
+
+# ======================
+# 이미지 수집: 헤더로 크기 확인 → 축소 디코딩 → 미리보기/모델 입력만 세션에 저장
+# ======================
+INGEST_LIMITS = Limits(
+    max_bytes=int(st.secrets.get("MAX_UPLOAD_MB", 20)) << 20,
+    max_pixels=int(float(st.secrets.get("MAX_IMAGE_MP", 50)) * 1e6),
+    flag_pixels=int(float(st.secrets.get("FLAG_IMAGE_MP", 12)) * 1e6),
+    preview_max=int(st.secrets.get("PREVIEW_MAX_PX", 1024)),
+)
+MEMORY_BUDGET_MB = int(st.secrets.get("MEMORY_BUDGET_MB", 512))
+
+@st.cache_resource
+def get_memory_budget(max_mb: int) -> MemoryBudget:
+    budget = MemoryBudget(max_mb << 20)
+    REGISTRY.register_collector("ingest_budget", budget.stats)
+    return budget
+
+memory_budget = get_memory_budget(MEMORY_BUDGET_MB)
+
+def ingest_upload(b: bytes, timings: dict):
+    """새 이미지일 때만 수집 (같은 이미지가 다시 들어오면 해시만 비교)."""
+    key = image_key(b, PREDICTION_ID)
+    cur = st.session_state.image
+    if cur is not None and cur.key == key: return
+    try:
+        st.session_state.image = ingest(b, key, memory_budget, INGEST_LIMITS, preprocessor, FAST_DECODE, timings)
+        st.session_state.ingest_error = None
+    except IngestError as e:
+        st.session_state.image, st.session_state.ingest_error = None, str(e)
+
 # ======================
 # 입력(카메라/업로드)
 # ======================
-tab_cam, tab_file = st.tabs(["📷 카메라로 촬영", "📁 파일 업로드"])
+tab_cam, tab_file, tab_bulk = st.tabs(["📷 카메라로 촬영", "📁 파일 업로드", "📦 일괄 분류"])
 new_bytes = None
 
 with tab_cam:
@@ -196,116 +401,231 @@ with tab_file:
     if f is not None:
         new_bytes = f.getvalue()
 
+with tab_bulk:
+    bulk_files = st.file_uploader("여러 이미지 또는 ZIP 파일을 올리세요", accept_multiple_files=True,
+                                  type=["jpg","png","jpeg","webp","tiff","zip"], key="bulk_files")
+    st.caption(f"업로드는 파일당 {st.get_option('server.maxUploadSize')}MB까지입니다. "
+               "더 큰 묶음은 서버에서 `python bulk.py 폴더/ --out results.csv`로 분류하세요.")
+    bulk_k = st.slider("Top-k", 1, len(labels), min(3, len(labels)))
+    if bulk_files and st.button("🚀 일괄 분류 시작"):
+        run_bulk(bulk_files, bulk_k)
+    if st.session_state.bulk_rows:
+        show_bulk_results()
+
+REGISTRY.inc("script_runs_total")  # 재실행 포함 모든 실행 (요청 수는 requests_total)
+req = {}  # 이번 실행의 단계별 소요시간
 if new_bytes:
-    st.session_state.img_bytes = new_bytes
+    ingest_upload(new_bytes, req)
+    del new_bytes
+if st.session_state.ingest_error:
+    st.error(st.session_state.ingest_error)
+
+# ======================
+# 비동기 예측: 배처 스레드가 추론하는 동안 화면은 먼저 그리고, 결과는 fragment가 확인
+# ======================
+def retry_prediction():
+    st.session_state.last_result = st.session_state.request = None
+
+def current_result(key: str):
+    """이 이미지의 결과: 캐시 → 이번 세션의 마지막 결과 순서로 찾음. 없거나 오래된 오류면 None (→ 다시 제출)."""
+    result = pred_cache.get(key)
+    last = st.session_state.last_result
+    if result is None and last and last[0] == key:
+        if isinstance(last[1], str) and time.monotonic() - last[2] > PREDICTION_ERROR_TTL:
+            retry_prediction()
+        else:
+            result = last[1]
+    return result
+
+def submit_prediction(key: str, make_input):
+    """같은 이미지 요청이 진행 중이면 그대로 두고, 다른(이전) 이미지 요청은 취소 후 새로 제출."""
+    pending = st.session_state.pending
+    if pending and pending[0] == key: return
+    if pending: pending[1].cancel()
+    fut = batcher.submit(make_input())
+    fut.add_done_callback(lambda f: f.cancelled() or f.exception() or pred_cache.put(key, f.result()))
+    st.session_state.pending = (key, fut)
+
+@st.fragment(run_every=PREDICTION_POLL_SEC)
+def prediction_waiter(key: str):
+    """예측이 끝날 때까지 주기적으로 확인. 끝나면 결과를 저장하고 전체 화면을 다시 그림."""
+    pending = st.session_state.pending
+    if pending is None or pending[0] != key: return
+    fut = pending[1]
+    if not fut.done():
+        st.markdown('<div class="prediction-box"><h2>🧠 분석 중...</h2></div>', unsafe_allow_html=True)
+        return
+    st.session_state.pending = None
+    if fut.cancelled(): return
+    st.session_state.inference_timings = (key, getattr(fut, "timings", {}))
+    err = fut.exception()
+    st.session_state.last_result = (key, f"{type(err).__name__}: {err}" if err else fut.result(), time.monotonic())
+    st.rerun()
 
 # ======================
 # 예측 & 레이아웃
 # ======================
-if st.session_state.img_bytes:
-    top_l, top_r = st.columns([1, 1], vertical_alignment="center")
-
-    pil_img = load_pil_from_bytes(st.session_state.img_bytes)
-    with top_l:
-        st.image(pil_img, caption="입력 이미지", use_container_width=True)
-
-    with st.spinner("🧠 분석 중..."):
-        pred, pred_idx, probs = learner.predict(PILImage.create(np.array(pil_img)))
-        st.session_state.last_prediction = str(pred)
-
-    with top_r:
-        st.markdown(
-            f"""
-            <div class="prediction-box">
-                <span style="font-size:1.0rem;color:#555;">예측 결과:</span>
-                <h2>{st.session_state.last_prediction}</h2>
-                <div class="helper">오른쪽 패널에서 예측 라벨의 콘텐츠가 표시됩니다.</div>
-            </div>
-            """, unsafe_allow_html=True
-        )
-
-    left, right = st.columns([1,1], vertical_alignment="top")
-
-    # 왼쪽: 확률 막대
-    with left:
-        st.subheader("상세 예측 확률")
-        prob_list = sorted(
-            [(labels[i], float(probs[i])) for i in range(len(labels))],
-            key=lambda x: x[1], reverse=True
-        )
-        for lbl, p in prob_list:
-            pct = p * 100
-            hi = "highlight" if lbl == st.session_state.last_prediction else ""
-            st.markdown(
-                f"""
-                <div class="prob-card">
-                  <div style="display:flex;justify-content:space-between;margin-bottom:6px;">
-                    <strong>{lbl}</strong><span>{pct:.2f}%</span>
-                  </div>
-                  <div class="prob-bar-bg">
-                    <div class="prob-bar-fg {hi}" style="width:{pct:.4f}%;"></div>
-                  </div>
-                </div>
-                """, unsafe_allow_html=True
-            )
-
-    # 오른쪽: 정보 패널 (예측 라벨 기본, 다른 라벨로 바꿔보기 가능)
-    with right:
-        st.subheader("라벨별 고정 콘텐츠")
-        default_idx = labels.index(st.session_state.last_prediction) if st.session_state.last_prediction in labels else 0
-        info_label = st.selectbox("표시할 라벨 선택", options=labels, index=default_idx)
-
-        texts, images, videos = get_content_for_label(info_label)
-
-        if not any([texts, images, videos]):
-            st.info(f"라벨 `{info_label}`에 대한 콘텐츠가 아직 없습니다. 코드의 CONTENT_BY_LABEL에 추가하세요.")
+if st.session_state.image is not None:
+    img = st.session_state.image
+    t_req, prof_out = time.perf_counter(), {}
+    with profile_request(PROFILE_REQUEST, prof_out):
+        top_l, top_r = st.columns([1, 1], vertical_alignment="center")
+
+        with top_l:
+            st.image(img.preview, caption="입력 이미지", use_container_width=True)
+            if img.flagged:
+                st.caption(f"원본 {img.info.width}×{img.info.height} — 큰 이미지입니다 (미리보기는 축소본).")
+
+        key = img.key
+        result = current_result(key)
+        cache_hit = result is not None
+        if result is None and PROFILE_REQUEST:
+            # 프로파일링할 때는 forward까지 잡히도록 이 스레드에서 직접 추론
+            fwd, _, _ = get_forward(learner, MODEL_ID, INFERENCE_BACKEND, QUANT_MODE)
+            result = batch_predict(learner, [img.model_input], forward=fwd, preprocess=preprocessor, timings=req)[0]
+            pred_cache.put(key, result)
+        if result is None:
+            submit_prediction(key, lambda: img.model_input)
+            st.session_state.last_prediction = None
+        elif isinstance(result, str):
+            st.session_state.last_prediction = None
         else:
-            # 텍스트
-            if texts:
-                st.markdown('<div class="info-grid">', unsafe_allow_html=True)
-                for t in texts:
-                    st.markdown(f"""
-                    <div class="card" style="grid-column:span 12;">
-                      <h4>텍스트</h4>
-                      <div>{t}</div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                st.markdown('</div>', unsafe_allow_html=True)
-
-            # 이미지(최대 3, 3열)
-            if images:
-                st.markdown('<div class="info-grid">', unsafe_allow_html=True)
-                for url in images[:3]:
-                    st.markdown(f"""
-                    <div class="card" style="grid-column:span 4;">
-                      <h4>이미지</h4>
-                      <img src="{url}" class="thumb" />
-                    </div>
-                    """, unsafe_allow_html=True)
-                st.markdown('</div>', unsafe_allow_html=True)
-
-            # 동영상(유튜브 썸네일)
-            if videos:
-                st.markdown('<div class="info-grid">', unsafe_allow_html=True)
-                for v in videos[:3]:
-                    thumb = yt_thumb(v)
-                    if thumb:
+            pred, pred_idx, probs = result
+            st.session_state.last_prediction = str(pred)
+
+        with timed("render", req):
+            with top_r:
+                if result is None:
+                    prediction_waiter(key)
+                elif isinstance(result, str):
+                    st.error(f"예측 중 오류가 발생했습니다: {result}")
+                    st.button("🔄 다시 시도", on_click=retry_prediction)
+                else:
+                    st.markdown(
+                        f"""
+                        <div class="prediction-box">
+                            <span style="font-size:1.0rem;color:#555;">예측 결과:</span>
+                            <h2>{st.session_state.last_prediction}</h2>
+                            <div class="helper">오른쪽 패널에서 예측 라벨의 콘텐츠가 표시됩니다.</div>
+                        </div>
+                        """, unsafe_allow_html=True
+                    )
+
+            left, right = st.columns([1,1], vertical_alignment="top")
+
+            # 왼쪽: 확률 막대
+            with left:
+                st.subheader("상세 예측 확률")
+                if result is None or isinstance(result, str):
+                    st.caption("분석이 끝나면 표시됩니다.")
+                else:
+                    prob_list = sorted(
+                        [(labels[i], float(probs[i])) for i in range(len(labels))],
+                        key=lambda x: x[1], reverse=True
+                    )
+                    for lbl, p in prob_list:
+                        pct = p * 100
+                        hi = "highlight" if lbl == st.session_state.last_prediction else ""
+                        st.markdown(
+                            f"""
+                            <div class="prob-card">
+                              <div style="display:flex;justify-content:space-between;margin-bottom:6px;">
+                                <strong>{lbl}</strong><span>{pct:.2f}%</span>
+                              </div>
+                              <div class="prob-bar-bg">
+                                <div class="prob-bar-fg {hi}" style="width:{pct:.4f}%;"></div>
+                              </div>
+                            </div>
+                            """, unsafe_allow_html=True
+                        )
+
+        # 오른쪽: 정보 패널 (예측 라벨 기본, 다른 라벨로 바꿔보기 가능)
+        with right:
+            st.subheader("라벨별 고정 콘텐츠")
+            default_idx = labels.index(st.session_state.last_prediction) if st.session_state.last_prediction in labels else 0
+            info_label = st.selectbox("표시할 라벨 선택", options=labels, index=default_idx)
+
+            texts, images, videos = get_content_for_label(info_label)
+
+            if not any([texts, images, videos]):
+                st.info(f"라벨 `{info_label}`에 대한 콘텐츠가 아직 없습니다. `{CONTENT_PATH}`에 추가하세요.")
+            else:
+                # 텍스트
+                if texts:
+                    st.markdown('<div class="info-grid">', unsafe_allow_html=True)
+                    for t in texts:
                         st.markdown(f"""
-                        <div class="card" style="grid-column:span 6;">
-                          <h4>동영상</h4>
-                          <a href="{v}" target="_blank" class="thumb-wrap">
-                            <img src="{thumb}" class="thumb"/>
-                            <div class="play"></div>
-                          </a>
-                          <div class="helper">{v}</div>
+                        <div class="card" style="grid-column:span 12;">
+                          <h4>텍스트</h4>
+                          <div>{t}</div>
                         </div>
                         """, unsafe_allow_html=True)
-                    else:
+                    st.markdown('</div>', unsafe_allow_html=True)
+
+                # 이미지(최대 3, 3열)
+                if images:
+                    st.markdown('<div class="info-grid">', unsafe_allow_html=True)
+                    for url in images[:3]:
                         st.markdown(f"""
-                        <div class="card" style="grid-column:span 6;">
-                          <h4>동영상</h4>
-                          <a href="{v}" target="_blank">{v}</a>
+                        <div class="card" style="grid-column:span 4;">
+                          <h4>이미지</h4>
+                          <img src="{media_url(url)}" class="thumb" />
                         </div>
                         """, unsafe_allow_html=True)
+                    st.markdown('</div>', unsafe_allow_html=True)
+
+                # 동영상(유튜브 썸네일)
+                if videos:
+                    st.markdown('<div class="info-grid">', unsafe_allow_html=True)
+                    for v in videos[:3]:
+                        thumb = yt_thumb(v)
+                        if thumb:
+                            st.markdown(f"""
+                            <div class="card" style="grid-column:span 6;">
+                              <h4>동영상</h4>
+                              <a href="{v}" target="_blank" class="thumb-wrap">
+                                <img src="{media_url(thumb)}" class="thumb"/>
+                                <div class="play"></div>
+                              </a>
+                              <div class="helper">{v}</div>
+                            </div>
+                            """, unsafe_allow_html=True)
+                        else:
+                            st.markdown(f"""
+                            <div class="card" style="grid-column:span 6;">
+                              <h4>동영상</h4>
+                              <a href="{v}" target="_blank">{v}</a>
+                            </div>
+                            """, unsafe_allow_html=True)
+
+    # 요청 = 이미지 하나에 대해 결과가 나올 때까지의 실행들 (결과 확인용 재실행 포함). 끝났을 때 한 번만 집계·기록
+    req["run"] = time.perf_counter() - t_req
+    cur = st.session_state.request
+    if cur is None or cur["key"] != key:
+        cur = st.session_state.request = {"key": key, "t0": t_req, "runs": 0, "stages": {},
+                                          "cache_hit": cache_hit, "done": False}
+    cur["runs"] += 1
+    for k, v in req.items(): cur["stages"][k] = cur["stages"].get(k, 0.0) + v
+    if result is not None and not cur["done"]:
+        cur["done"] = True
+        inf, pending = st.session_state.inference_timings, st.session_state.pending
+        if pending and pending[0] == key and pending[1].done():  # 대기 fragment보다 먼저 다시 실행된 경우
+            inf = (key, getattr(pending[1], "timings", {}))
+        if inf and inf[0] == key:  # 배처 스레드에서 잰 추론 단계 (비동기 경로)
+            st.session_state.inference_timings = None
+            for k, v in inf[1].items():
+                if k == "batch_size": cur["batch_size"] = v
+                else: cur["stages"][k] = cur["stages"].get(k, 0.0) + v
+        cur["stages"]["total"] = time.perf_counter() - cur["t0"]
+        REGISTRY.inc("requests_total")
+        REGISTRY.observe("request_seconds", cur["stages"]["total"])
+        if LOG_REQUESTS:
+            log_request({"image": key[:16], "format": img.info.format, "size": (img.info.width, img.info.height),
+                         "retained_bytes": img.nbytes, "flagged": img.flagged, "cache_hit": cur["cache_hit"],
+                         "error": isinstance(result, str), "runs": cur["runs"], "backend": backend_used,
+                         "batch_size": cur.get("batch_size"),
+                         "stages": cur["stages"]})
+    if prof_out:
+        show_profile(prof_out)
 else:
     st.info("카메라로 촬영하거나 파일을 업로드하면 분석 결과와 라벨별 콘텐츠가 표시됩니다.")
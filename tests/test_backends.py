@@ -0,0 +1,60 @@
+# 백엔드 내보내기/불러오기: eager와 같은 결과가 나오는지 (fastai 없이 learner 구조만 흉내)
+import os
+from types import SimpleNamespace
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("PIL")
+
+from PIL import Image
+from backends import artifact_path, compare_backends, load_backend
+from inference import batch_predict, TensorPreprocessor
+
+def _tfm(name: str, **attrs):
+    return type(name, (), attrs)()
+
+@pytest.fixture(scope="module")
+def learner():
+    """TensorPreprocessor.from_learner가 읽는 after_item / after_batch 변환 이름과 속성만 갖춘 learner."""
+    torch.manual_seed(0)
+    model = torch.nn.Sequential(torch.nn.Conv2d(3, 8, 3, 2, 1), torch.nn.ReLU(), torch.nn.AdaptiveAvgPool2d(1),
+                                torch.nn.Flatten(), torch.nn.Linear(8, 3)).eval()
+    after_item = SimpleNamespace(fs=[_tfm("Resize", size=(32, 32), method="crop", mode=Image.BILINEAR),
+                                     _tfm("ToTensor")])
+    after_batch = SimpleNamespace(fs=[_tfm("IntToFloatTensor", div=255.0, split_idx=None),
+                                      _tfm("Normalize", mean=torch.full((1, 3, 1, 1), 0.5),
+                                           std=torch.full((1, 3, 1, 1), 0.25), split_idx=None)])
+    return SimpleNamespace(model=model, loss_func=None,
+                           dls=SimpleNamespace(vocab=["a", "b", "c"], after_item=after_item, after_batch=after_batch))
+
+@pytest.fixture(scope="module")
+def model_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("model") / "model.pkl"
+    path.write_bytes(b"placeholder")
+    return str(path)
+
+@pytest.fixture(scope="module")
+def images():
+    return [Image.new("RGB", (48 + 8 * i, 40), (30 * i, 100, 200 - 30 * i)) for i in range(4)]
+
+@pytest.mark.parametrize("backend,atol", [("torchscript", 1e-5), ("onnx", 1e-4), ("quantized", 1e-2)])
+def test_backend_matches_eager(learner, model_path, images, backend, atol):
+    if backend == "onnx":
+        pytest.importorskip("onnxruntime")
+    prep = TensorPreprocessor.from_learner(learner)
+    ref = batch_predict(learner, images, preprocess=prep)
+    fwd = load_backend(learner, backend, model_path)
+    out = batch_predict(learner, images, forward=fwd, preprocess=prep)  # 배치 4 (내보낼 때는 1) → 가변 배치 확인
+    assert os.path.exists(artifact_path(model_path, backend))
+    for (p, _, probs), (rp, _, rprobs) in zip(out, ref):
+        assert (probs - rprobs).abs().max().item() <= atol
+
+def test_onnx_export_is_single_file(learner, model_path):
+    pytest.importorskip("onnxruntime")
+    load_backend(learner, "onnx", model_path)
+    leftovers = [f for f in os.listdir(os.path.dirname(model_path)) if ".tmp" in f or f.endswith(".data")]
+    assert not leftovers
+
+def test_compare_backends_reports_every_backend(learner, model_path, images):
+    report = compare_backends(learner, model_path, images, backends=("eager", "torchscript"), repeat=1)
+    assert report["eager"]["top1_agree"] == 1.0 and "error" not in report["torchscript"]
@@ -0,0 +1,36 @@
+# 마이크로 배처: 결과와 함께 요청별 단계 소요시간이 Future로 전달되는지
+from types import SimpleNamespace
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("PIL")
+
+from PIL import Image
+from inference import MicroBatcher, TensorPreprocessor, batch_predict
+
+@pytest.fixture
+def batcher():
+    model = torch.nn.Sequential(torch.nn.AdaptiveAvgPool2d(1), torch.nn.Flatten(), torch.nn.Linear(3, 2)).eval()
+    learner = SimpleNamespace(model=model, loss_func=None, dls=SimpleNamespace(vocab=["a", "b"]))
+    prep = TensorPreprocessor((16, 16), "squish", Image.BILINEAR)
+    b = MicroBatcher(lambda items, t: batch_predict(learner, items, preprocess=prep, timings=t), 4, 50)
+    yield b
+    b.close()
+
+def test_future_carries_stage_timings(batcher):
+    futs = [batcher.submit(Image.new("RGB", (20, 20), (i * 50, 0, 0))) for i in range(3)]
+    for f in futs:
+        pred, _, probs = f.result(timeout=10)
+        assert pred in ("a", "b") and probs.shape == (2,)
+        assert {"queue_wait", "preprocess", "forward", "postprocess"} <= set(f.timings)
+        assert f.timings["forward"] > 0 and 1 <= f.timings["batch_size"] <= 3
+    assert batcher.stats()["requests"] == 3
+
+def test_batch_error_goes_to_every_future():
+    b = MicroBatcher(lambda items, t: 1 / 0, 4, 10)
+    try:
+        with pytest.raises(ZeroDivisionError):
+            b.submit(object()).result(timeout=10)
+        assert b.stats()["errors"] == 1
+    finally:
+        b.close()
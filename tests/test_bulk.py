@@ -0,0 +1,57 @@
+# 일괄 분류: 큰 ZIP 항목은 압축을 풀기 전에 거부, 행 단위 오류/표시
+import io, tracemalloc, zipfile
+from types import SimpleNamespace
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("PIL")
+
+from PIL import Image
+from bulk import classify_stream, iter_zip, read_capped
+from inference import TensorPreprocessor
+from ingest import IngestError, Limits, MemoryBudget
+
+def jpeg(size=(320, 240)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, (20, 120, 220)).save(buf, "JPEG")
+    return buf.getvalue()
+
+def make_zip(members: dict) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+        for name, data in members.items(): z.writestr(name, data)
+    return buf.getvalue()
+
+@pytest.fixture
+def learner():
+    model = torch.nn.Sequential(torch.nn.AdaptiveAvgPool2d(1), torch.nn.Flatten(), torch.nn.Linear(3, 2)).eval()
+    return SimpleNamespace(model=model, loss_func=None, dls=SimpleNamespace(vocab=["a", "b"]))
+
+def test_oversized_zip_member_rejected_before_decompressing():
+    bomb = make_zip({"bomb.jpg": b"\0" * (64 << 20)})  # 압축하면 수십 KB
+    assert len(bomb) < 1 << 20
+    tracemalloc.start()
+    try:
+        (name, read), = iter_zip(io.BytesIO(bomb), max_bytes=1 << 20)
+        with pytest.raises(IngestError):
+            read()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert name == "bomb.jpg" and peak < 4 << 20
+
+def test_read_capped_ignores_declared_size():
+    with pytest.raises(IngestError):
+        read_capped(io.BytesIO(b"x" * 101), 100)
+    assert read_capped(io.BytesIO(b"x" * 100), 100) == b"x" * 100
+
+def test_rows_report_rejections_per_entry(learner):
+    data = make_zip({"ok.jpg": jpeg(), "big.jpg": b"\0" * (2 << 20), "bad.jpg": b"not an image"})
+    limits = Limits(max_bytes=1 << 20)
+    prep = TensorPreprocessor((32, 32), "crop", Image.BILINEAR)
+    rows = {r["file"]: r for r in classify_stream(learner, iter_zip(io.BytesIO(data), max_bytes=limits.max_bytes),
+                                                  preprocess=prep, batch_size=2, workers=2, top_k=1,
+                                                  limits=limits, budget=MemoryBudget(64 << 20))}
+    assert rows["ok.jpg"]["error"] == "" and rows["ok.jpg"]["top1"] in ("a", "b")
+    assert "너무 큽니다" in rows["big.jpg"]["error"]
+    assert rows["bad.jpg"]["error"].startswith("IngestError")
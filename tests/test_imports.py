@@ -0,0 +1,28 @@
+# streamlit_app.py와 각 모듈이 로컬 모듈에서 가져오는 이름이 모두 실제로 있는지 (streamlit 없이 확인)
+import ast, importlib, os
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("PIL")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOCAL_MODULES = {os.path.splitext(f)[0] for f in os.listdir(ROOT) if f.endswith(".py")}
+
+def local_imports(filename: str):
+    tree = ast.parse(open(os.path.join(ROOT, filename), encoding="utf-8").read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module in LOCAL_MODULES:
+            for alias in node.names:
+                yield node.module, alias.name
+
+@pytest.mark.parametrize("filename", sorted(m + ".py" for m in LOCAL_MODULES))
+def test_local_imports_resolve(filename):
+    missing = [f"{m}.{n}" for m, n in local_imports(filename) if not hasattr(importlib.import_module(m), n)]
+    assert not missing, missing
+
+def test_source_from_uri():
+    from model_store import DriveSource, HTTPSource, LocalSource, source_from_uri
+    assert isinstance(source_from_uri("gdrive:abc"), DriveSource) and source_from_uri("gdrive:abc").file_id == "abc"
+    assert isinstance(source_from_uri("https://example.com/model.pkl"), HTTPSource)
+    assert isinstance(source_from_uri("file:///tmp/model.pkl"), HTTPSource)
+    assert isinstance(source_from_uri("model.pkl"), LocalSource)
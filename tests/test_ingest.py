@@ -0,0 +1,48 @@
+# 단일 이미지 수집: 상한 검사, 보관 크기, 일괄 분류 경로와 같은 모델 입력
+import io
+import pytest
+
+pytest.importorskip("torch")
+np = pytest.importorskip("numpy")
+
+from PIL import Image
+from inference import TensorPreprocessor
+from ingest import IngestError, Limits, MemoryBudget, decode_bounded, ingest
+
+def jpeg(size, seed=0) -> bytes:
+    rng = np.random.default_rng(seed)
+    buf = io.BytesIO()
+    Image.fromarray(rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)).save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+@pytest.fixture
+def prep():
+    return TensorPreprocessor((64, 64), "crop", Image.BILINEAR)
+
+def test_full_decode_matches_bulk_path(prep):
+    b = jpeg((2400, 1600))
+    img = ingest(b, "k", MemoryBudget(), Limits(preview_max=256), prep, fast_decode=False)
+    _, bulk, _ = decode_bounded(b, MemoryBudget(), Limits(), None, prep.resize)
+    assert np.array_equal(np.asarray(img.model_input), np.asarray(bulk))
+    assert max(Image.open(io.BytesIO(img.preview)).size) <= 256
+
+def test_fast_decode_uses_draft(prep):
+    b = jpeg((2400, 1600))
+    fast = ingest(b, "k", MemoryBudget(), Limits(), prep, fast_decode=True)
+    full = ingest(b, "k", MemoryBudget(), Limits(), prep, fast_decode=False)
+    assert fast.model_input.size == full.model_input.size == (64, 64)
+    assert not np.array_equal(np.asarray(fast.model_input), np.asarray(full.model_input))
+
+def test_limits_and_flagging(prep):
+    b = jpeg((1000, 800))
+    with pytest.raises(IngestError):
+        ingest(b, "k", MemoryBudget(), Limits(max_bytes=len(b) - 1), prep)
+    with pytest.raises(IngestError):
+        ingest(b, "k", MemoryBudget(), Limits(max_pixels=799_999), prep)
+    assert ingest(b, "k", MemoryBudget(), Limits(flag_pixels=500_000), prep).flagged
+    with pytest.raises(IngestError):
+        ingest(b"not an image", "k", MemoryBudget(), Limits(), prep)
+
+def test_budget_rejects_single_oversized_decode(prep):
+    with pytest.raises(IngestError):
+        ingest(jpeg((1000, 800)), "k", MemoryBudget(max_bytes=1 << 20), Limits(), prep)
@@ -0,0 +1,54 @@
+# 썸네일 캐시 / 미디어 프록시 (네트워크 대신 로컬 fetcher 사용)
+import pytest
+
+pytest.importorskip("PIL")
+
+from io import BytesIO
+from PIL import Image
+from media_cache import MediaProxy, ThumbnailCache
+
+def png(color, size=(800, 600)) -> bytes:
+    buf = BytesIO()
+    Image.new("RGB", size, color).save(buf, "PNG")
+    return buf.getvalue()
+
+class LocalFetcher:
+    """url → bytes. 호출된 URL을 기록하고, 모르는 URL은 실패."""
+    def __init__(self, images: dict): self.images, self.calls = images, []
+    def __call__(self, url: str) -> bytes:
+        self.calls.append(url)
+        if url not in self.images: raise IOError(f"404 {url}")
+        return self.images[url]
+
+@pytest.fixture
+def cache(tmp_path):
+    return ThumbnailCache(static_dir=str(tmp_path), max_bytes=1)  # 원격 썸네일은 항상 하나만 남음
+
+def test_local_thumbnails_are_pinned(cache):
+    local = cache.put(png("red"))
+    for i in range(5):
+        cache.put_remote(f"https://example.com/{i}.png", png((i, i, i)))
+    assert cache.exists(local)
+    assert cache.stats()["pinned_files"] == 1
+    assert cache.stats()["files"] == 1 and cache.stats()["evictions"] == 4
+
+def test_thumbnail_is_resized(cache, tmp_path):
+    url = cache.put(png("blue", (2000, 1000)))
+    img = Image.open(tmp_path / url.split("app/static/")[1])
+    assert img.format == "WEBP" and img.width == cache.width
+
+def test_proxy_fetches_once_and_serves_local_url(cache):
+    fetcher = LocalFetcher({"https://example.com/a.jpg": png("green")})
+    proxy = MediaProxy(cache, fetcher, workers=1)
+    assert proxy.url_for("https://example.com/a.jpg") == "https://example.com/a.jpg"  # 첫 렌더는 원본 URL
+    proxy._pool.shutdown(wait=True)
+    local = proxy.url_for("https://example.com/a.jpg")
+    assert local.startswith(cache.url_prefix) and cache.exists(local)
+    assert fetcher.calls == ["https://example.com/a.jpg"]
+
+def test_proxy_backs_off_after_failure(cache):
+    fetcher = LocalFetcher({})
+    proxy = MediaProxy(cache, fetcher, workers=1, retry_after=300)
+    assert proxy.fetch("https://example.com/missing.jpg") is None
+    assert proxy.prefetch(["https://example.com/missing.jpg"]) == []
+    assert proxy.stats()["failures"] == 1 and len(fetcher.calls) == 1
@@ -0,0 +1,72 @@
+# 모델 저장소: 버전 결정 / 잘린 파일 거부 / revision 없는 소스(해시 없는 Drive)의 캐시 재사용
+import os, time, zipfile
+import pytest
+
+pytest.importorskip("PIL")
+
+from model_store import LocalSource, ModelStore
+
+def write_model(path, data: str):
+    with zipfile.ZipFile(path, "w") as z: z.writestr("data.pkl", data)
+
+def read_model(path) -> str:
+    with zipfile.ZipFile(path) as z: return z.read("data.pkl").decode()
+
+class NoRevisionSource:
+    """Drive처럼 바뀌었는지 싸게 알 수 없는 소스. 다운로드 횟수를 셈."""
+    def __init__(self, src: str): self.src, self.fetches = src, 0
+    def __repr__(self): return f"NoRevisionSource({self.src!r})"
+    def revision(self): return None
+    def fetch(self, dest: str):
+        self.fetches += 1
+        with open(self.src, "rb") as f, open(dest, "wb") as out: out.write(f.read())
+
+def test_local_source_change_is_picked_up(tmp_path):
+    model, store = tmp_path / "model.pkl", ModelStore(str(tmp_path / "cache"))
+    write_model(model, "v1")
+    assert read_model(store.fetch([LocalSource(str(model))])) == "v1"
+    time.sleep(0.01)
+    write_model(model, "v2")
+    assert read_model(store.fetch([LocalSource(str(model))])) == "v2"
+
+def test_truncated_download_is_rejected(tmp_path):
+    model = tmp_path / "model.pkl"
+    write_model(model, "x" * 10000)
+    data = model.read_bytes()
+    model.write_bytes(data[:len(data) // 2])
+    with pytest.raises(RuntimeError, match="잘린"):
+        ModelStore(str(tmp_path / "cache")).fetch([LocalSource(str(model))])
+
+def test_sha256_mismatch_is_rejected(tmp_path):
+    model = tmp_path / "model.pkl"
+    write_model(model, "v1")
+    with pytest.raises(RuntimeError, match="SHA-256"):
+        ModelStore(str(tmp_path / "cache")).fetch([LocalSource(str(model))], sha256="0" * 64)
+
+def test_unpinned_source_reuses_cached_copy(tmp_path):
+    remote = tmp_path / "remote.pkl"
+    write_model(remote, "v1")
+    src = NoRevisionSource(str(remote))
+    store = ModelStore(str(tmp_path / "cache"))
+    path = store.fetch([src], refresh="never")
+    mtime = os.stat(path).st_mtime_ns
+    for _ in range(3):
+        assert store.fetch([src], refresh="never") == path
+    assert src.fetches == 1 and os.stat(path).st_mtime_ns == mtime
+
+def test_background_refresh_replaces_only_on_change(tmp_path):
+    remote = tmp_path / "remote.pkl"
+    write_model(remote, "v1")
+    src = NoRevisionSource(str(remote))
+    store = ModelStore(str(tmp_path / "cache"))
+    path = store.fetch([src])
+    mtime = os.stat(path).st_mtime_ns
+    # 같은 내용: 다시 받아도 파일은 그대로 (MODEL_ID·내보낸 아티팩트가 바뀌지 않음)
+    store.fetch([src])
+    store.start_refresh().join()
+    assert src.fetches == 2 and os.stat(path).st_mtime_ns == mtime
+    # 바뀐 내용: 이번에는 캐시 사본을 쓰고, 백그라운드 새로고침 후 다음 fetch부터 새 모델
+    write_model(remote, "v2")
+    assert read_model(store.fetch([src])) == "v1"
+    store.start_refresh().join()
+    assert read_model(store.fetch([src], refresh="never")) == "v2"
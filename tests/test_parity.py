@@ -0,0 +1,45 @@
+# 직접 전처리 경로(TensorPreprocessor + batch_predict)가 learner.predict와 같은 결과를 내는지 확인
+# 오프라인 합성 모델 사용 (bench.make_synthetic_model)
+import pytest
+
+pytest.importorskip("fastai")
+
+import numpy as np
+from fastai.vision.all import PILImage, load_learner
+from bench import make_image, make_synthetic_model
+from inference import TensorPreprocessor, batch_predict, check_parity, decode_image
+
+ATOL = 1e-5
+
+@pytest.fixture(scope="module", params=["crop", "squish"])
+def learner(request, tmp_path_factory):
+    path = make_synthetic_model(str(tmp_path_factory.mktemp(request.param) / "model.pkl"), 64,
+                                resize_method=request.param)
+    learn = load_learner(path, cpu=True)
+    learn.model.eval()
+    return learn
+
+@pytest.fixture(scope="module")
+def images():
+    # 가로/세로/정사각 + EXIF 회전 (crop은 비율이 다른 입력에서만 squish와 결과가 갈림)
+    specs = [((160, 120), "JPEG", False), ((120, 200), "PNG", False), ((96, 96), "WEBP", False),
+             ((200, 90), "JPEG", True)]
+    return [decode_image(make_image(size, fmt, rot, seed=i)) for i, (size, fmt, rot) in enumerate(specs)]
+
+def test_preprocessor_supported(learner):
+    prep = TensorPreprocessor.from_learner(learner)
+    resize = next(t for t in learner.dls.after_item.fs if type(t).__name__ == "Resize")
+    assert prep is not None and prep.method == str(resize.method)
+
+def test_batch_predict_matches_learner_predict(learner, images):
+    prep = TensorPreprocessor.from_learner(learner)
+    fast = batch_predict(learner, images, preprocess=prep)
+    for img, (pred, pred_idx, probs) in zip(images, fast):
+        ref_pred, ref_idx, ref_probs = learner.predict(PILImage.create(np.array(img)))
+        assert str(pred) == str(ref_pred)
+        assert int(pred_idx) == int(ref_idx)
+        assert (probs - ref_probs).abs().max().item() <= ATOL
+
+def test_check_parity(learner, images):
+    res = check_parity(learner, images, atol=ATOL)
+    assert res["supported"] and res["ok"], res